@@ -1,7 +1,23 @@
-import json
+import io
 import os
 from pathlib import Path
 import sys
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from operator import itemgetter
+
+from json_utils import load_json
+
+try:
+    import ijson
+    try:
+        # Prefer the C (yajl2) backend when it was built
+        ijson = ijson.get_backend('yajl2_c')
+    except ImportError:
+        pass
+except ImportError:
+    ijson = None
 
 def coco_to_yolo_bbox(coco_bbox, img_width, img_height):
     """
@@ -32,6 +48,55 @@ def coco_to_yolo_bbox(coco_bbox, img_width, img_height):
     
     return [x_center_norm, y_center_norm, width_norm, height_norm]
 
+def coco_to_yolo_bbox_batch(bboxes, wh):
+    """
+    Vectorized version of coco_to_yolo_bbox for many boxes at once
+    
+    Args:
+        bboxes: (N, 4) array of [x_min, y_min, width, height] in pixels
+        wh: (2,) array of [img_width, img_height] in pixels
+    
+    Returns:
+        (N, 4) float array of [x_center, y_center, width, height] normalized to 0-1
+    """
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    wh = np.asarray(wh, dtype=np.float64)
+    
+    centers = bboxes[:, :2] + bboxes[:, 2:] / 2
+    return np.concatenate((centers, bboxes[:, 2:]), axis=1) / np.tile(wh, 2)
+
+# Row format for YOLO label files: class_id x_center y_center width height
+YOLO_ROW_FMT = ['%d', '%.6f', '%.6f', '%.6f', '%.6f']
+
+def _stream_section(coco_json_path, section):
+    """Yield the items of one top-level COCO section straight from disk"""
+    with open(coco_json_path, 'rb') as f:
+        yield from ijson.items(f, f'{section}.item', use_float=True)
+
+def load_coco_sections(coco_json_path):
+    """
+    Load the categories, images and annotations sections of a COCO file
+    
+    When ijson is installed each section is streamed from disk, so the whole
+    document is never held in memory at once. Otherwise the file is parsed in one go.
+    
+    Args:
+        coco_json_path: Path to COCO JSON annotation file
+    
+    Returns:
+        Tuple of (categories, images, annotations) iterables
+    """
+    sections = ('categories', 'images', 'annotations')
+    if ijson is None:
+        coco_data = load_json(coco_json_path)
+        return tuple(coco_data[section] for section in sections)
+    return tuple(_stream_section(coco_json_path, section) for section in sections)
+
+def _write_bytes(path, data):
+    """Write data to the file at path"""
+    with open(path, 'wb') as f:
+        f.write(data)
+
 def convert_coco_to_yolo(coco_json_path, output_dir, class_mapping=None):
     """
     Convert COCO annotations to YOLO format
@@ -41,71 +106,80 @@ def convert_coco_to_yolo(coco_json_path, output_dir, class_mapping=None):
         output_dir: Directory to save YOLO format annotations
         class_mapping: Optional dict to map COCO category IDs to YOLO class IDs
     """
-    # Load COCO annotations
-    with open(coco_json_path, 'r') as f:
-        coco_data = json.load(f)
+    # Load COCO annotations (streamed section by section when possible)
+    coco_categories, coco_images, coco_annotations = load_coco_sections(coco_json_path)
     
     # Create output directory
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
+    output_dir_str = str(output_dir)
     
-    # Create image info lookup
-    images = {img['id']: img for img in coco_data['images']}
+    # Create compact image info lookup: id -> (width, height, file_name)
+    images = {img['id']: (img['width'], img['height'], img['file_name']) for img in coco_images}
     
     # Create category mapping if not provided
     if class_mapping is None:
-        categories = {cat['id']: idx for idx, cat in enumerate(sorted(coco_data['categories'], key=lambda x: x['id']))}
+        categories = {cat['id']: idx for idx, cat in enumerate(sorted(coco_categories, key=lambda x: x['id']))}
     else:
         categories = class_mapping
     
-    # Group annotations by image
-    annotations_by_image = {}
-    for ann in coco_data['annotations']:
-        img_id = ann['image_id']
-        if img_id not in annotations_by_image:
-            annotations_by_image[img_id] = []
-        annotations_by_image[img_id].append(ann)
-    
-    # Convert each image's annotations
-    for img_id, annotations in annotations_by_image.items():
-        img_info = images[img_id]
-        img_width = img_info['width']
-        img_height = img_info['height']
-        img_filename = img_info['file_name']
+    # Lookup table: lut[coco_cat_id] = yolo_class_id. Unmapped ids hold -1, and the
+    # extra last slot is a -1 sentinel that out-of-range ids are redirected to.
+    lut = np.full(max(categories, default=-1) + 2, -1, dtype=np.int32)
+    for coco_cat_id, yolo_class_id in categories.items():
+        lut[coco_cat_id] = yolo_class_id
+    
+    # Group annotations by image. A list loaded in memory is sorted first so each
+    # image forms a single group; a stream is grouped by contiguous runs instead.
+    # Rows are buffered per label file and written out in one pass at the end.
+    if isinstance(coco_annotations, list):
+        coco_annotations.sort(key=itemgetter('image_id'))
+    
+    outputs = {}  # txt_path -> encoded YOLO rows
+    num_converted = 0
+    
+    for img_id, annotations in groupby(coco_annotations, key=itemgetter('image_id')):
+        img_width, img_height, img_filename = images[img_id]
         
-        # Create corresponding .txt filename
-        txt_filename = Path(img_filename).stem + '.txt'
-        txt_path = output_dir / txt_filename
+        # Create corresponding .txt filename (plain strings; pathlib is slow per image)
+        txt_filename = os.path.splitext(os.path.basename(img_filename))[0] + '.txt'
+        txt_path = os.path.join(output_dir_str, txt_filename)
         
-        # Convert annotations for this image
-        yolo_annotations = []
+        cat_ids = []
+        bboxes = []
         for ann in annotations:
             # Skip if annotation doesn't have bbox or is crowd
             if 'bbox' not in ann or ann.get('iscrowd', 0):
                 continue
             
-            # Get class ID
-            coco_cat_id = ann['category_id']
-            if coco_cat_id not in categories:
-                print(f"Warning: Category ID {coco_cat_id} not found in mapping")
-                continue
-            
-            yolo_class_id = categories[coco_cat_id]
-            
-            # Convert bbox
-            coco_bbox = ann['bbox']
-            yolo_bbox = coco_to_yolo_bbox(coco_bbox, img_width, img_height)
-            
-            # Format: class_id x_center y_center width height
-            yolo_line = f"{yolo_class_id} {' '.join(map(str, yolo_bbox))}"
-            yolo_annotations.append(yolo_line)
+            cat_ids.append(ann['category_id'])
+            bboxes.append(ann['bbox'])
+        
+        rows = outputs.setdefault(txt_path, bytearray())
+        if not bboxes:
+            continue
         
-        # Write to file
-        with open(txt_path, 'w') as f:
-            f.write('\n'.join(yolo_annotations))
+        # Get class IDs for all boxes with one lookup
+        cat_ids = np.asarray(cat_ids)
+        in_range = (cat_ids >= 0) & (cat_ids < len(lut))
+        class_ids = lut[np.where(in_range, cat_ids, len(lut) - 1)]
+        valid = class_ids >= 0
+        for coco_cat_id in cat_ids[~valid]:
+            print(f"Warning: Category ID {coco_cat_id} not found in mapping")
         
-        if yolo_annotations:
-            print(f"Converted {len(yolo_annotations)} annotations for {img_filename}")
+        # Convert all boxes for this image in one shot
+        if valid.any():
+            yolo_bboxes = coco_to_yolo_bbox_batch(np.asarray(bboxes)[valid], (img_width, img_height))
+            encoded = io.BytesIO()
+            np.savetxt(encoded, np.column_stack((class_ids[valid], yolo_bboxes)), fmt=YOLO_ROW_FMT)
+            rows += encoded.getvalue()
+            num_converted += int(valid.sum())
+    
+    # Write all label files; the payloads are tiny so open/close dominates
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        list(executor.map(lambda item: _write_bytes(*item), outputs.items()))
+    
+    print(f"Converted {num_converted} annotations for {len(outputs)} images")
 
 def create_yolo_yaml(coco_json_path, yaml_path):
     """
@@ -115,11 +189,10 @@ def create_yolo_yaml(coco_json_path, yaml_path):
         coco_json_path: Path to COCO JSON annotation file
         yaml_path: Output path for YAML file
     """
-    with open(coco_json_path, 'r') as f:
-        coco_data = json.load(f)
+    coco_categories, _, _ = load_coco_sections(coco_json_path)
     
     # Extract class names
-    class_names = [cat['name'] for cat in sorted(coco_data['categories'], key=lambda x: x['id'])]
+    class_names = [cat['name'] for cat in sorted(coco_categories, key=lambda x: x['id'])]
     
     yaml_content = f"""# YOLOv8 dataset configuration
 # Generated from COCO annotations
@@ -0,0 +1,20 @@
+"""JSON loading shared by the dataset scripts in this folder"""
+
+import json
+import mmap
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def load_json(path):
+    """Parse a JSON file, using orjson over a memory map when it is installed"""
+    if orjson is None:
+        with open(path, 'r') as f:
+            return json.load(f)
+    with open(path, 'rb') as f:
+        # Parse straight from the mapped pages instead of reading the file first
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as buf:
+            return orjson.loads(buf)
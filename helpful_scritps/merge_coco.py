@@ -22,8 +22,14 @@ import sys
 import shutil
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import argparse
 
+from json_utils import load_json
+
+# Number of image copies kept in flight at once
+COPY_WORKERS = 16
+
 
 def load_coco_dataset(dataset_path):
     """Load COCO dataset from directory."""
@@ -36,12 +42,49 @@ def load_coco_dataset(dataset_path):
     if not frames_dir.exists():
         raise FileNotFoundError(f"frames directory not found in {dataset_path}")
     
-    with open(labels_file, 'r') as f:
-        coco_data = json.load(f)
+    coco_data = load_json(labels_file)
     
     return coco_data, frames_dir
 
 
+def _link_or_copy(src, dst):
+    """
+    Place src at dst as cheaply as possible.
+    
+    Tries a hardlink first (no data is copied), then os.copy_file_range, which
+    lets reflink-capable filesystems such as XFS and Btrfs share extents, and
+    finally a plain copy. Hardlinked frames share their data with the source
+    dataset, so avoid editing them in place; deleting a merged frame does not
+    affect the source.
+    """
+    # Re-running a merge must replace, not fail on, existing frames
+    try:
+        os.remove(dst)
+    except FileNotFoundError:
+        pass
+    
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass  # e.g. EXDEV across filesystems, or links unsupported
+    
+    if hasattr(os, 'copy_file_range'):
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            return
+        except OSError:
+            pass
+    
+    shutil.copyfile(src, dst)
+
+
 def create_class_mapping(datasets_info):
     """
     Create a mapping from old class IDs to new unified class IDs.
@@ -50,6 +93,7 @@ def create_class_mapping(datasets_info):
     # Collect all unique class names and their IDs from all datasets
     all_classes = {}  # class_name -> (first_seen_id, datasets_with_this_class)
     dataset_class_maps = []  # List of {old_id -> new_id} for each dataset
+    max_id = 0  # Highest class ID assigned so far
     
     for i, (video_name, coco_data, _) in enumerate(datasets_info):
         dataset_classes = {cat['name']: cat['id'] for cat in coco_data['categories']}
@@ -61,10 +105,11 @@ def create_class_mapping(datasets_info):
                 if i == 0:
                     # For the first dataset, keep original IDs
                     new_id = old_id
+                    max_id = max(max_id, old_id)
                 else:
                     # For subsequent datasets, assign new ID
-                    used_ids = set(info[0] for info in all_classes.values())
-                    new_id = max(used_ids, default=0) + 1
+                    max_id += 1
+                    new_id = max_id
                 
                 all_classes[class_name] = (new_id, [video_name])
             else:
@@ -88,6 +133,79 @@ def create_class_mapping(datasets_info):
     return dataset_class_maps, final_categories, all_classes
 
 
+def process_dataset(video_name, coco_data, frames_dir, class_mapping, output_frames_dir,
+                    next_image_id, next_annotation_id):
+    """
+    Remap one dataset into the merged id space and link its frames into the output.
+    Image and annotation ids are numbered from the given starting ids.
+    
+    Returns:
+        (images, annotations) lists for the merged dataset
+    """
+    print(f"\nProcessing dataset: {video_name}")
+    
+    images = []
+    annotations = []
+    copy_jobs = []  # (src, dst) image copies, run together once the dataset is scanned
+    
+    # List the frames directory once instead of stat-ing every image
+    frame_names = {entry.name for entry in os.scandir(frames_dir)}
+    
+    # Create image ID mapping for this dataset
+    dataset_image_mapping = {}
+    
+    # Process images
+    for img_info in coco_data['images']:
+        old_image_id = img_info['id']
+        old_filename = img_info['file_name']
+        
+        # Create new filename with prefix
+        new_filename = f"{video_name}_{old_filename}"
+        
+        # Copy image file
+        old_image_path = frames_dir / old_filename
+        new_image_path = output_frames_dir / new_filename
+        
+        # Names with subdirectories are not in the listing, so check those directly
+        if old_filename in frame_names or old_image_path.exists():
+            copy_jobs.append((old_image_path, new_image_path))
+        else:
+            print(f"Warning: Image file {old_image_path} not found")
+        
+        # Update image info in place; the parsed dataset is not reused
+        img_info['id'] = next_image_id
+        img_info['file_name'] = new_filename
+        
+        dataset_image_mapping[old_image_id] = next_image_id
+        images.append(img_info)
+        
+        next_image_id += 1
+    
+    # Process annotations
+    for ann_info in coco_data['annotations']:
+        old_image_id = ann_info['image_id']
+        old_category_id = ann_info['category_id']
+        
+        # Skip if image was not found
+        if old_image_id not in dataset_image_mapping:
+            continue
+        
+        # Update annotation in place
+        ann_info['id'] = next_annotation_id
+        ann_info['image_id'] = dataset_image_mapping[old_image_id]
+        ann_info['category_id'] = class_mapping[old_category_id]
+        
+        annotations.append(ann_info)
+        next_annotation_id += 1
+    
+    # Link or copy images; overlapping the operations keeps the disk queue busy
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as executor:
+        list(executor.map(lambda job: _link_or_copy(*job), copy_jobs))
+    
+    print(f"  Processed {len(coco_data['images'])} images and {len(coco_data['annotations'])} annotations")
+    return images, annotations
+
+
 def merge_datasets(dataset_paths, output_dir):
     """Main function to merge COCO datasets."""
     output_dir = Path(output_dir)
@@ -128,63 +246,16 @@ def merge_datasets(dataset_paths, output_dir):
     # Track ID counters
     next_image_id = 1
     next_annotation_id = 1
-    image_id_mapping = {}  # old_image_id -> new_image_id for each dataset
     
     # Process each dataset
     for dataset_idx, (video_name, coco_data, frames_dir) in enumerate(datasets_info):
-        print(f"\nProcessing dataset: {video_name}")
-        
-        # Create image ID mapping for this dataset
-        dataset_image_mapping = {}
-        
-        # Process images
-        for img_info in coco_data['images']:
-            old_image_id = img_info['id']
-            old_filename = img_info['file_name']
-            
-            # Create new filename with prefix
-            new_filename = f"{video_name}_{old_filename}"
-            
-            # Copy image file
-            old_image_path = frames_dir / old_filename
-            new_image_path = output_frames_dir / new_filename
-            
-            if old_image_path.exists():
-                shutil.copy2(old_image_path, new_image_path)
-            else:
-                print(f"Warning: Image file {old_image_path} not found")
-            
-            # Create new image info
-            new_image_info = img_info.copy()
-            new_image_info['id'] = next_image_id
-            new_image_info['file_name'] = new_filename
-            
-            dataset_image_mapping[old_image_id] = next_image_id
-            merged_dataset['images'].append(new_image_info)
-            
-            next_image_id += 1
-        
-        # Process annotations
-        class_mapping = dataset_class_maps[dataset_idx]
-        
-        for ann_info in coco_data['annotations']:
-            old_image_id = ann_info['image_id']
-            old_category_id = ann_info['category_id']
-            
-            # Skip if image was not found
-            if old_image_id not in dataset_image_mapping:
-                continue
-            
-            # Create new annotation
-            new_ann_info = ann_info.copy()
-            new_ann_info['id'] = next_annotation_id
-            new_ann_info['image_id'] = dataset_image_mapping[old_image_id]
-            new_ann_info['category_id'] = class_mapping[old_category_id]
-            
-            merged_dataset['annotations'].append(new_ann_info)
-            next_annotation_id += 1
-        
-        print(f"  Processed {len(coco_data['images'])} images and {len(coco_data['annotations'])} annotations")
+        images, annotations = process_dataset(video_name, coco_data, frames_dir,
+                                              dataset_class_maps[dataset_idx], output_frames_dir,
+                                              next_image_id, next_annotation_id)
+        merged_dataset['images'].extend(images)
+        merged_dataset['annotations'].extend(annotations)
+        next_image_id += len(images)
+        next_annotation_id += len(annotations)
     
     # Save merged dataset
     output_labels_path = output_dir / "labels.json"
@@ -4,7 +4,6 @@ folder=$(basename "$PWD")
 cd frames
 rename "s/^/${folder}_/" *
 
-cd ../yolo
-rename "s/^/${folder}_/" *
+# The yolo labels are already prefixed: they are named after file_name in labels.json
 
 echo "Done!"
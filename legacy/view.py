@@ -7,11 +7,13 @@ import argparse
 
 parser = argparse.ArgumentParser(description="Block Detection Video Labeler")
 parser.add_argument("video_path", type=str, help="Path to the video file")
+parser.add_argument("--backend", choices=["opencv", "decord"], default="opencv",
+                    help="Video reader; decord seeks exactly to a frame without re-decoding")
 args = parser.parse_args()
 
 video_path = args.video_path
 
-block_labeler = BlockLabeler(video_path)
+block_labeler = BlockLabeler(video_path, backend=args.backend)
 
 cv2.namedWindow('Frame by Frame Player', cv2.WINDOW_AUTOSIZE)
 cv2.setMouseCallback('Frame by Frame Player', block_labeler.mouse_callback)
@@ -24,24 +26,41 @@ print("  'a': Previous frame")
 print("  'j': Jump to frame (enter number)")
 print("  Click: label point")
 
+# Last frame shown with its HUD, reused while the index and frame are unchanged
+last_idx = -1
+last_frame = None
+hud_frame = None
+
 while not block_labeler.quit_video:
-    frame = block_labeler.show_frame()
-    
-    
-    # Frame info
-    cv2.putText(frame, f"Frame: {block_labeler.current_frame_index}/{block_labeler.total_frames}", 
-                (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-    cv2.putText(frame, f"Time: {(block_labeler.current_frame_index/block_labeler.fps):.2f}s", 
-                (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-    
-    cv2.imshow('Frame by Frame Player', frame)
+    # Pick up masks SAM2 finished on its worker thread
+    block_labeler.process_sam2_results()
+
+    # Redraw only after a key press or click; the window keeps showing the last frame
+    if block_labeler.dirty:
+        block_labeler.dirty = False
+        frame = block_labeler.show_frame()
+        
+        # A new frame object means it was re-read or re-annotated
+        if block_labeler.current_frame_index != last_idx or frame is not last_frame or hud_frame is None:
+            last_idx = block_labeler.current_frame_index
+            last_frame = frame
+            # Draw the HUD on a copy so the labeler's frame stays clean
+            hud_frame = frame.copy()
+
+            # Frame info
+            cv2.putText(hud_frame, f"Frame: {block_labeler.current_frame_index}/{block_labeler.total_frames}", 
+                        (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            cv2.putText(hud_frame, f"Time: {(block_labeler.current_frame_index/block_labeler.fps):.2f}s", 
+                        (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        
+        cv2.imshow('Frame by Frame Player', hud_frame)
     
-    # Handle input
-    key = cv2.waitKey(1) & 0xFF
+    # Handle input; waiting up to 30 ms keeps the loop from spinning while idle
+    key = cv2.waitKey(30) & 0xFF
     block_labeler.handle_key(key)
     
 
-block_labeler.cap.release()
+block_labeler.close()
 cv2.destroyAllWindows()
 
 
@@ -1,11 +1,28 @@
 import cv2
 import os
+import shutil
+import subprocess
+import queue
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 
+try:
+    import decord # optional frame-accurate random access reader
+except ImportError:
+    decord = None
+
 # from view import get_click_on_frame, visualize_sam2_results
 from model import Labeler
 from dataset import COCODataset
 
+# Decoded frames kept by BlockLabeler, so refining a frame or stepping back over recent
+# frames doesn't seek and decode again
+FRAME_CACHE_SIZE = 64
+
+# Frames with their masks drawn, so stepping back and forth doesn't redraw the overlay
+ANNOTATED_CACHE_SIZE = 16
+
 def draw_mask(frame, mask, obj_id=None, random_color=False, alpha=0.6):
     """
     Draw mask overlay on OpenCV frame with blue color only
@@ -21,10 +38,19 @@ def draw_mask(frame, mask, obj_id=None, random_color=False, alpha=0.6):
         frame: Modified frame with blue mask overlay
     """
     color = (255, 0, 0)  # Blue in BGR
-    colored_mask = np.zeros_like(frame, dtype=np.uint8)
     mask = np.squeeze(mask)
-    colored_mask[mask > 0] = color
-    cv2.addWeighted(frame, 1.0, colored_mask, alpha, 0, frame)
+    mask = (mask > 0).view(np.uint8) if mask.dtype != bool else mask.view(np.uint8)
+
+    # Only pixels inside the mask's bounding box can change
+    x, y, w, h = cv2.boundingRect(mask)
+    if w == 0 or h == 0:
+        return frame
+
+    # frame + alpha * color on masked pixels, the same as addWeighted with a colored
+    # mask, but without building a full-frame color image
+    increment = tuple(round(c * alpha) for c in color)
+    roi = frame[y:y + h, x:x + w]
+    cv2.add(roi, increment, dst=roi, mask=mask[y:y + h, x:x + w])
     return frame
 
 
@@ -42,23 +68,29 @@ def draw_points(frame, coords, labels, marker_size=8, thickness=2):
     Returns:
         frame: Modified frame with points drawn
     """
-    for coord, label in zip(coords, labels):
-        x, y = int(coord[0]), int(coord[1])
-        
-        if label == 1:  # Positive point
-            # Draw green star-like marker
-            cv2.drawMarker(frame, (x, y), (0, 255, 0), cv2.MARKER_STAR, 
-                          markerSize=marker_size, thickness=thickness)
-            # Add white border
-            cv2.drawMarker(frame, (x, y), (255, 255, 255), cv2.MARKER_STAR, 
-                          markerSize=marker_size, thickness=1)
-        else:  # Negative point
-            # Draw red star-like marker
-            cv2.drawMarker(frame, (x, y), (0, 0, 255), cv2.MARKER_STAR, 
-                          markerSize=marker_size, thickness=thickness)
-            # Add white border
-            cv2.drawMarker(frame, (x, y), (255, 255, 255), cv2.MARKER_STAR, 
-                          markerSize=marker_size, thickness=1)
+    coords = np.asarray(coords).reshape(-1, 2).astype(np.int32)
+    labels = np.asarray(labels).reshape(-1)
+    if len(coords) == 0:
+        return frame
+
+    # The four strokes of cv2.MARKER_STAR, as (start, end) offsets from the point
+    half = marker_size // 2
+    star = np.array([
+        [[-half, 0], [half, 0]],
+        [[0, -half], [0, half]],
+        [[-half, -half], [half, half]],
+        [[half, -half], [-half, half]],
+    ], np.int32)
+
+    # One polylines call per color draws every point's strokes, instead of two
+    # drawMarker calls per point
+    strokes = coords[:, None, None, :] + star[None] # (points, strokes, 2, 2)
+    for label_value, color in ((1, (0, 255, 0)), (0, (0, 0, 255))): # green positive, red negative
+        selected = strokes[labels == label_value].reshape(-1, 2, 2)
+        if len(selected):
+            cv2.polylines(frame, list(selected), False, color, thickness)
+    # Add white border
+    cv2.polylines(frame, list(strokes.reshape(-1, 2, 2)), False, (255, 255, 255), 1)
     
     return frame
 
@@ -115,15 +147,37 @@ def visualize_sam2_results(frame, masks_dict, points=None, labels=None, boxes=No
 
 
 class BlockLabeler:
-    def __init__(self, video_path):
+    def __init__(self, video_path, backend="opencv", jpeg_quality=90):
+        """
+        backend: "opencv" reads frames with VideoCapture; "decord" reads them with
+        decord.VideoReader, which seeks to an exact frame without re-decoding from a keyframe
+        jpeg_quality: quality of the frames extracted for SAM2; 90 looks the same as 100
+        for labeling and training at a fraction of the size and encode time
+        """
         self.video_path = video_path
+        self.jpeg_quality = jpeg_quality
         self.cap = cv2.VideoCapture(video_path)
+        self.vr = None
+        if backend == "decord":
+            if decord is None:
+                raise ValueError("decord is not installed, use the opencv backend")
+            self.vr = decord.VideoReader(video_path, ctx=decord.cpu(0))
+        elif backend != "opencv":
+            raise ValueError(f"Unknown video backend: {backend}")
         self.quit_video = False
         self.paused = False
         self.current_frame_index = 0
         self.labeler = None
         self.anno_start_idx = None
         self.current_frame = None
+        self.next_read_idx = 0 # frame the capture will return on its next read()
+        self.frame_cache = OrderedDict() # frame index -> read-only decoded frame, oldest first
+        self.annotated_cache = OrderedDict() # frame index -> (masks it was drawn from, frame)
+        # SAM2 runs on one worker thread so the window keeps redrawing; its results are
+        # handed back through sam2_results and applied on the main thread
+        self.sam2_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sam2")
+        self.sam2_results = queue.Queue()
+        self.dirty = True  # the view redraws only when input may have changed what is shown
         self.video_name = os.path.basename(video_path).split('.')[0]
 
         if not self.cap.isOpened():
@@ -147,47 +201,87 @@ class BlockLabeler:
         return self.current_frame
 
 
+    def read_frame(self, idx):
+        """Read frame idx, seeking only when it is not the next frame in the stream"""
+        if self.vr is not None:
+            if idx >= len(self.vr):
+                return None
+            # decord returns RGB; the rest of the labeler draws in BGR
+            return cv2.cvtColor(self.vr[idx].asnumpy(), cv2.COLOR_RGB2BGR)
+
+        # Seeking re-decodes from the previous keyframe, so stepping forward just reads on
+        if idx != self.next_read_idx:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+        ok, frame = self.cap.read()
+        self.next_read_idx = idx + 1 if ok else None
+        return frame
+
+    def get_raw_frame(self, idx):
+        """Decoded frame idx from the cache; read-only, copy it before drawing on it"""
+        frame = self.frame_cache.get(idx)
+        if frame is not None:
+            self.frame_cache.move_to_end(idx)
+            return frame
+
+        frame = self.read_frame(idx)
+        if frame is not None:
+            frame.flags.writeable = False
+            self.frame_cache[idx] = frame
+            if len(self.frame_cache) > FRAME_CACHE_SIZE:
+                self.frame_cache.popitem(last=False)
+        return frame
+
     def set_frame(self):
         """Get the next frame from the video"""
         
-        self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.current_frame_index)
-        _, frame = self.cap.read()
-
-        if self.anno_start_idx is not None and len(self.labeler.video_segments) > 0:
+        # The labeler stays None until the first SAM2 job has set it up
+        if (self.anno_start_idx is not None and self.labeler is not None
+                and len(self.labeler.video_segments) > 0):
             # Annotate the frame with the current labeler state
-            masks_dict = self.labeler.video_segments[self.current_frame_index - self.anno_start_idx]
-            frame = visualize_sam2_results(frame, masks_dict)
+            segment_idx = self.current_frame_index - self.anno_start_idx
+            segments = self.labeler.video_segments[segment_idx]
+
+            # Propagation replaces video_segments wholesale, so the same dict object
+            # means the masks haven't changed since this frame was drawn
+            cached = self.annotated_cache.get(self.current_frame_index)
+            if cached is not None and cached[0] is segments:
+                self.annotated_cache.move_to_end(self.current_frame_index)
+                self.current_frame = cached[1]
+                return
+
+            # video_segments holds bit-packed masks; unpack only this frame's, as bool
+            masks_dict = {
+                obj_id: self.labeler.get_mask(segment_idx, obj_id)
+                for obj_id in segments
+            }
+            frame = visualize_sam2_results(self.get_raw_frame(self.current_frame_index).copy(), masks_dict)
+            frame.flags.writeable = False
+            self.annotated_cache[self.current_frame_index] = (segments, frame)
+            if len(self.annotated_cache) > ANNOTATED_CACHE_SIZE:
+                self.annotated_cache.popitem(last=False)
+        else:
+            frame = self.get_raw_frame(self.current_frame_index)
         
         self.current_frame = frame
 
     def reset_frame(self):
 
-        self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.current_frame_index)
-        self.current_frame = self.cap.read()[1]
+        # A writable copy, since the caller draws the new mask and points on it
+        self.current_frame = self.get_raw_frame(self.current_frame_index).copy()
         
     
     def extract_frames_from_curr_to_end(self):
         self.anno_start_idx = self.current_frame_index
         print(f"Extracting frames from {self.anno_start_idx} to end of video...")
 
-        # Create a temporary directory to store frames
+        # Create a temporary directory to store frames, dropping frames from a previous run
         self.frame_dir = self.video_name + "/frames/"
+        shutil.rmtree(self.frame_dir, ignore_errors=True)
         os.makedirs(self.frame_dir, exist_ok=True)
-        # remove existing frames
-        for f in os.listdir(self.frame_dir):
-            os.remove(os.path.join(self.frame_dir, f))
-
-        frame_idx = self.current_frame_index
-        while frame_idx < self.total_frames:
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-            frame = self.cap.read()[1]
-                
-            # Save frame with 5-digit zero-padded filename
-            frame_filename = os.path.join(self.frame_dir, f"{frame_idx:05d}.jpg")
-
-            # Save with specified quality
-            cv2.imwrite(frame_filename, frame, [cv2.IMWRITE_JPEG_QUALITY, 100])
-            frame_idx += 1
+
+        # ffmpeg decodes and encodes on its own threads, outside the GIL
+        if not self.extract_frames_with_ffmpeg():
+            self.extract_frames_with_opencv()
 
         self.frame_names = [
             p for p in os.listdir(self.frame_dir)
@@ -195,53 +289,144 @@ class BlockLabeler:
         ]
         self.frame_names.sort(key=lambda p: int(os.path.splitext(p)[0]))
 
+    def extract_frames_with_ffmpeg(self):
+        """Dump frames from anno_start_idx on with an ffmpeg child process; False if unavailable"""
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            return False
+
+        # Select by decoded frame number rather than seeking by timestamp, so the file
+        # numbers line up with the frame indices the capture uses
+        cmd = [
+            ffmpeg, "-loglevel", "error", "-i", self.video_path,
+            "-vf", f"select=gte(n\\,{self.anno_start_idx})", "-vsync", "0",
+            # Rough mapping of jpeg_quality onto ffmpeg's 1 (best) to 31 scale: 100 -> 1, 90 -> 3
+            "-qmin", "1", "-qscale:v", str(1 + (100 - self.jpeg_quality) // 5),
+            "-start_number", str(self.anno_start_idx),
+            os.path.join(self.frame_dir, "%05d.jpg"),
+        ]
+        if subprocess.run(cmd).returncode != 0:
+            print("ffmpeg frame extraction failed, falling back to OpenCV")
+            return False
+        return True
+
+    def extract_frames_with_opencv(self):
+        """Dump frames from anno_start_idx on by reading and encoding them here"""
+        # Plain baseline JPEG: optimized Huffman tables or progressive scans save a few
+        # percent of size but more than double the encode time
+        jpeg_params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+
+        # Encode and write JPEGs on worker threads (cv2.imwrite releases the GIL) while
+        # decoding continues; in-flight writes are capped so decoded frames don't pile up
+        max_workers = max(1, (os.cpu_count() or 4) // 2)
+        pending_writes = deque()
+
+        # Frames are read in order, so seek once and let the decoder run forward
+        frame_idx = self.anno_start_idx
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while frame_idx < self.total_frames:
+                frame = self.read_frame(frame_idx) # a new array each call, safe to hand off
+                if frame is None:
+                    break
+                    
+                # Save frame with 5-digit zero-padded filename
+                frame_filename = os.path.join(self.frame_dir, f"{frame_idx:05d}.jpg")
+
+                # Save with specified quality
+                pending_writes.append(executor.submit(cv2.imwrite, frame_filename, frame, jpeg_params))
+                frame_idx += 1
+
+                if len(pending_writes) > 2 * max_workers:
+                    pending_writes.popleft().result()
+
+            for future in pending_writes:
+                future.result()
+
     def init_labeler(self):
         """Initialize the Labeler with the current video"""
-        self.labeler = Labeler("sam2_checkpoint/sam2.1_hiera_large.pt")
-        self.labeler.init_inference_state(video_dir=self.frame_dir)
+        labeler = Labeler("sam2_checkpoint/sam2.1_hiera_large.pt")
+        labeler.init_inference_state(video_dir=self.frame_dir)
+        # Only publish it once it is ready, so a failed setup is retried on the next click
+        self.labeler = labeler
         print("Labeler initialized with video frames.")
 
-    def draw_selected_object(self, x, y, label):
+    def select_object(self, x, y, label, frame_idx):
+        """Add a click to SAM2 and return the mask for it (runs on the SAM2 worker)"""
         _, mask = self.labeler.select_objects(
                 points=np.array([[x, y]]),
                 labels=np.array([label], np.int32),
                 ann_obj_id=1,
-                ann_frame_idx=self.current_frame_index - self.anno_start_idx
+                ann_frame_idx=frame_idx - self.anno_start_idx
             )
+        return mask
 
+    def draw_selected_object(self, x, y, label, mask):
         # update the showing frame
         self.reset_frame() # reset the current frame
         self.current_frame = draw_mask(self.current_frame, mask)
         self.current_frame = draw_points(self.current_frame, np.array([[x, y]]), np.array([label]), 10)
 
-    def mouse_callback(self, event, x, y, flags, param):
-        if event == cv2.EVENT_LBUTTONDOWN:
-            print(f"Click at ({x}, {y}) - Frame {self.current_frame_index + 1}")
+    def run_sam2(self, x, y, label, frame_idx, first_click):
+        """SAM2 worker job: set up on the first click, segment the click, then propagate"""
+        if first_click:
+            # The labeler is created here too, so its CUDA autocast is entered on this thread
+            self.extract_frames_from_curr_to_end()
+            self.init_labeler()
+
+        mask = self.select_object(x, y, label, frame_idx)
+        # Show the clicked frame's mask right away, without waiting for propagation
+        self.sam2_results.put(lambda: self.draw_selected_object(x, y, label, mask))
+
+        # may ask for additional confirmation before running through the video
+        self.labeler.run_through_video()
 
-            self.paused = True
+    def sam2_done(self, future):
+        """Called on the worker when a SAM2 job ends; unpause from the main thread"""
+        def finish():
+            self.paused = False
+            error = future.exception()
+            if error is not None:
+                print(f"SAM2 failed: {error}")
+                if self.labeler is None:
+                    # Setup failed part way; start it over on the next click
+                    self.anno_start_idx = None
+        self.sam2_results.put(finish)
+
+    def process_sam2_results(self):
+        """Apply finished SAM2 work; call from the main loop"""
+        while True:
+            try:
+                callback = self.sam2_results.get_nowait()
+            except queue.Empty:
+                return
+            callback()
+            self.dirty = True
 
-            if self.labeler is None: # first click
-                self.extract_frames_from_curr_to_end()
-                self.init_labeler()
-                self.draw_selected_object(x, y, 1)
+    def start_sam2(self, x, y, label):
+        if self.paused:
+            print("waiting for processing to finish...")
+            return
 
-                # may ask for additional confirmation before running through the video
-                self.labeler.run_through_video()
+        self.paused = True
+        first_click = self.labeler is None
+        future = self.sam2_executor.submit(self.run_sam2, x, y, label, self.current_frame_index, first_click)
+        future.add_done_callback(self.sam2_done)
 
-            else: 
-                # Add a new point to the current frame
-                self.draw_selected_object(x, y, 1)
-                self.labeler.run_through_video()
+    def mouse_callback(self, event, x, y, flags, param):
+        if event in (cv2.EVENT_LBUTTONDOWN, cv2.EVENT_RBUTTONDOWN):
+            self.dirty = True
 
-            self.paused = False
+        if event == cv2.EVENT_LBUTTONDOWN:
+            print(f"Click at ({x}, {y}) - Frame {self.current_frame_index + 1}")
+
+            # the first click also extracts the frames and loads SAM2;
+            # later ones add a new point to the current frame
+            self.start_sam2(x, y, 1)
         elif event == cv2.EVENT_RBUTTONDOWN:
             print(f"Right click at ({x}, {y}) - Frame {self.current_frame_index + 1}")
 
             # assume labeler is initialized
-            self.paused = True
-            self.draw_selected_object(x, y, 0)
-            self.labeler.run_through_video()
-            self.paused = False
+            self.start_sam2(x, y, 0)
 
 
         elif event == cv2.EVENT_RBUTTONDOWN:
@@ -275,6 +460,10 @@ class BlockLabeler:
             print("Already at the first frame")
 
     def handle_key(self, key):
+        if key == 0xFF: # no key pressed
+            return
+        self.dirty = True
+
         if self.paused:
             # work as a blocker
             print("waiting for processing to finish...")
@@ -300,23 +489,23 @@ class BlockLabeler:
             except ValueError:
                 print("Invalid frame number")
 
+    def close(self):
+        """Wait for SAM2 work in flight and release the video"""
+        self.sam2_executor.shutdown()
+        self.cap.release()
+
     def save_labels(self, start_idx, end_idx):
-        block_dataset = COCODataset("block_detection_dataset", "block")
-        
-        # make each file name unique, prefix with video name
-
-        # rename the files in the images directory
-        for i in range(len(self.frame_names)):
-            old_name = os.path.join(self.frame_dir, self.frame_names[i])
-            new_name = os.path.join(self.frame_dir, f"{self.video_name}_{self.frame_names[i]}")
-            os.rename(old_name, new_name)
-            self.frame_names[i] = new_name
+        block_dataset = COCODataset("block_detection_dataset")
         
+        # make each file name unique, prefix with video name. Only the exported
+        # file_name carries the prefix; the frames on disk keep the numeric names SAM2 reads
 
         for i in range(start_idx, end_idx + 1):
             block_dataset.add_sam_mask(
-                mask=self.labeler.video_segments[i][1],  # Assuming obj_id 1 for the block
-                image_path=self.frame_names[i]
+                mask=self.labeler.get_mask(i, 1),  # Assuming obj_id 1 for the block
+                image_path=os.path.join(self.frame_dir, self.frame_names[i]),
+                object_name="block",
+                file_name=f"{self.video_name}_{self.frame_names[i]}"
             )
 
         block_dataset.export_to_json(os.path.join(self.video_name, "labels.json"))
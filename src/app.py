@@ -4,8 +4,6 @@ Main application entry point for the Video Labeler
 MVVM Architecture with tkinter UI
 """
 
-from .ui.tkinter_view import VideoLabelerApp
-
 def main():
     """Main entry point for the MVVM Video Labeler"""
     print("🎬 Video Labeler - MVVM Edition")
@@ -31,7 +29,8 @@ def main():
     
     print("\n🚀 Starting application...")
     
-    # Start the application
+    # Start the application (the UI stack is only imported once we get here)
+    from .ui.tkinter_view import VideoLabelerApp
     app = VideoLabelerApp()
     app.run()
 
@@ -1,7 +1,14 @@
 """
 Core labeler functionality
 """
-from .model import Labeler
 from .dataset import COCODataset
 
 __all__ = ['Labeler', 'COCODataset']
+
+
+def __getattr__(name):
+    # Labeler pulls in torch and SAM2, so only import it when it is actually used
+    if name == 'Labeler':
+        from .model import Labeler
+        return Labeler
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,12 +4,38 @@ import numpy as np
 import os
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 """
 This module creates a COCO formated object detection dataset for 1 object.
 """
 
+# Sections that can be spooled to disk instead of held in memory
+SPOOLED_SECTIONS = ("images", "annotations")
+
+
+def _dumps(obj) -> bytes:
+    """Serialize obj to compact JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj).encode()
+
+
 class COCODataset:
-    def __init__(self, name="multi_object_detection_dataset"):
+    def __init__(self, name="multi_object_detection_dataset", spool_prefix=None):
+        """
+        Args:
+            name (str): Dataset description.
+            spool_prefix (str): If set, images and annotations are appended to
+                "<spool_prefix>.images.jsonl" / ".annotations.jsonl" as they are
+                added instead of being kept in memory. The files are only scratch
+                space for keeping memory flat: they are truncated here and removed
+                by close(), so they can't be used to recover a dataset. Call close()
+                when done.
+        """
         self.coco_dataset = {
             "info": {
                 "year": 2025,
@@ -27,6 +53,18 @@ class COCODataset:
         self.image_id_map = {}     # Maps image_filename -> image_id to prevent duplicates
         self.next_image_id = 1
         self.next_annotation_id = 1
+        
+        self._spool = {}  # section -> open JSONL sidecar file
+        if spool_prefix is not None:
+            for section in SPOOLED_SECTIONS:
+                self._spool[section] = open(f"{spool_prefix}.{section}.jsonl", 'w+b')
+    
+    def _append(self, section: str, entry: dict):
+        """Add an entry to a dataset section, spooling it to disk if enabled"""
+        if section in self._spool:
+            self._spool[section].write(_dumps(entry) + b'\n')
+        else:
+            self.coco_dataset[section].append(entry)
     
     def add_category(self, object_name: str) -> int:
         """Add a new category and return its ID"""
@@ -45,9 +83,12 @@ class COCODataset:
         self.category_id_map[object_name] = category_id
         return category_id
     
-    def get_or_create_image(self, image_path: str, width: int, height: int) -> int:
-        """Get existing image ID or create new image entry. Returns image_id."""
-        filename = os.path.basename(image_path)
+    def get_or_create_image(self, image_path: str, width: int, height: int, file_name=None) -> int:
+        """
+        Get existing image ID or create new image entry. Returns image_id.
+        file_name, when given, is recorded instead of the basename of image_path.
+        """
+        filename = file_name or os.path.basename(image_path)
         
         # Check if image already exists
         if filename in self.image_id_map:
@@ -57,7 +98,7 @@ class COCODataset:
         image_id = self.next_image_id
         self.next_image_id += 1
         
-        self.coco_dataset["images"].append({
+        self._append("images", {
             "id": image_id,
             "file_name": filename,
             "width": width,
@@ -69,21 +110,34 @@ class COCODataset:
 
     def mask_to_bbox(self, mask):
         """Convert binary mask to bounding box [x, y, width, height]"""
-        rows, cols = np.where(mask > 0)
-        if len(rows) == 0:
+        if mask.dtype != bool:
+            # OpenCV's SIMD scan beats the NumPy projections below on uint8 input
+            m = mask if mask.dtype == np.uint8 else (mask > 0).view(np.uint8)
+            x, y, w, h = cv2.boundingRect(np.ascontiguousarray(m))
+            if w == 0:
+                return [0, 0, 0, 0]
+            return [x, y, w, h]
+        
+        # For bool masks, project onto each axis instead of materializing every pixel coordinate
+        cols_any = mask.any(axis=0)
+        rows_any = mask.any(axis=1)
+        if not cols_any.any():
             return [0, 0, 0, 0]
         
-        x_min, x_max = cols.min(), cols.max()
-        y_min, y_max = rows.min(), rows.max()
+        x_min = np.argmax(cols_any)
+        x_max = len(cols_any) - 1 - np.argmax(cols_any[::-1])
+        y_min = np.argmax(rows_any)
+        y_max = len(rows_any) - 1 - np.argmax(rows_any[::-1])
         
         return [int(x_min), int(y_min), int(x_max - x_min + 1), int(y_max - y_min + 1)]
 
-    def convert_mask_to_annotation(self, mask, category_id: int):
+    def convert_mask_to_annotation(self, mask, category_id: int, bbox=None):
         """
         Convert a binary mask to COCO annotation format.
+        A precomputed bbox [x, y, width, height] skips the scan of the mask.
         """
         # Get bounding box coordinates
-        x, y, w, h = self.mask_to_bbox(mask)
+        x, y, w, h = self.mask_to_bbox(mask) if bbox is None else bbox
         area = w * h
 
         annotation = {
@@ -99,7 +153,7 @@ class COCODataset:
         self.next_annotation_id += 1
         return annotation
     
-    def add_sam_mask(self, mask, image_path, object_name: str):
+    def add_sam_mask(self, mask, image_path, object_name: str, bbox=None, file_name=None):
         """
         Add a SAM mask to the dataset.
         
@@ -107,29 +161,91 @@ class COCODataset:
             mask (numpy.ndarray): Binary mask of the object.
             image_path (str): Path to the corresponding image.
             object_name (str): Name of the object category.
+            bbox (list, optional): Precomputed [x, y, width, height] of the mask.
+            file_name (str, optional): Image file name to record instead of the basename of image_path.
         """
         mask = np.squeeze(mask)
+        if bbox is None:
+            bbox = self.mask_to_bbox(mask)
+        self.add_sam_bbox(bbox, image_path, mask.shape[1], mask.shape[0], object_name, file_name)
+    
+    def add_sam_bbox(self, bbox, image_path, width: int, height: int, object_name: str, file_name=None):
+        """
+        Add an annotation from an already computed mask bounding box.
         
+        Args:
+            bbox (list): [x, y, width, height] of the mask.
+            image_path (str): Path to the corresponding image.
+            width (int): Image width.
+            height (int): Image height.
+            object_name (str): Name of the object category.
+            file_name (str, optional): Image file name to record instead of the basename of image_path.
+        """
         # Get or create category ID for this object
         category_id = self.add_category(object_name)
         
         # Get or create image entry (prevents duplicates)
-        image_id = self.get_or_create_image(image_path, mask.shape[1], mask.shape[0])
+        image_id = self.get_or_create_image(image_path, width, height, file_name)
         
         # Create annotation
-        annotation = self.convert_mask_to_annotation(mask, category_id)
+        annotation = self.convert_mask_to_annotation(None, category_id, bbox)
         annotation["image_id"] = image_id
         
         # Add annotation to dataset
-        self.coco_dataset["annotations"].append(annotation)
+        self._append("annotations", annotation)
 
-    def export_to_json(self, output_path):
+    def export_to_json(self, output_path, pretty=False):
         """
         Export the dataset to a JSON file.
+        Uses orjson when installed, which is much faster than the stdlib json module.
 
         Args:
             output_path (str): Path to save the JSON file.
+            pretty (bool): Indent the output for human reading (larger file).
+                Ignored for spooled datasets, which are always written compact.
         """
-        with open(output_path, 'w') as f:
-            json.dump(self.coco_dataset, f, indent=4)
+        if self._spool:
+            self._export_spooled(output_path)
+        elif orjson is not None:
+            option = orjson.OPT_SERIALIZE_NUMPY
+            if pretty:
+                option |= orjson.OPT_INDENT_2
+            with open(output_path, 'wb') as f:
+                f.write(orjson.dumps(self.coco_dataset, option=option))
+        else:
+            with open(output_path, 'w') as f:
+                json.dump(self.coco_dataset, f, indent=2 if pretty else None)
         print(f"Dataset exported to {output_path}")
+
+    def _export_spooled(self, output_path):
+        """Compose the COCO JSON from the in-memory sections and the spooled JSONL files"""
+        with open(output_path, 'wb') as out:
+            out.write(b'{')
+            for i, (key, value) in enumerate(self.coco_dataset.items()):
+                if i:
+                    out.write(b',')
+                out.write(_dumps(key) + b':')
+                
+                spool = self._spool.get(key)
+                if spool is None:
+                    out.write(_dumps(value))
+                    continue
+                
+                # Copy the spooled entries line by line, then resume appending at the end
+                out.write(b'[')
+                spool.flush()
+                spool.seek(0)
+                for j, line in enumerate(spool):
+                    if j:
+                        out.write(b',')
+                    out.write(line.rstrip(b'\n'))
+                spool.seek(0, os.SEEK_END)
+                out.write(b']')
+            out.write(b'}')
+
+    def close(self):
+        """Close and remove the spool files of a spooled dataset"""
+        for spool in self._spool.values():
+            spool.close()
+            os.remove(spool.name)
+        self._spool = {}
@@ -13,13 +13,16 @@ os.environ["PYTORCH_ENABLE_MPS_FALLBACK"] = "1"
 import numpy as np
 import torch
 
-from sam2.build_sam import build_sam2_video_predictor
+# Number of propagated frames whose masks are copied to the host before syncing
+TRANSFER_BATCH_FRAMES = 16
 
 
 class Labeler:
 
     video_segments = {}  # video_segments contains the per-frame segmentation results
-    # map[frame_idx] = mask
+    # map[frame_idx][obj_id] = mask bit-packed along its last (width) axis, see get_mask
+    mask_width = 0  # unpacked width of the masks in video_segments
+    video_bboxes = {}  # map[frame_idx][obj_id] = [x, y, w, h] of the propagated mask
 
     def __init__(self, model_path):
         # select the device for computation
@@ -30,6 +33,7 @@ class Labeler:
         else:
             device = torch.device("cpu")
         print(f"using device: {device}")
+        self.device = device
 
         if device.type == "cuda":
             # use bfloat16 for the entire notebook
@@ -46,6 +50,8 @@ class Labeler:
             )
 
 
+        from sam2.build_sam import build_sam2_video_predictor
+
         sam2_checkpoint = model_path
         model_cfg = "configs/sam2.1/sam2.1_hiera_l.yaml"
 
@@ -78,11 +84,72 @@ class Labeler:
         
         return out_obj_ids, (out_mask_logits[mask_idx] > 0.0).cpu().numpy()
     
-    def run_through_video(self):
+    @staticmethod
+    def _mask_bboxes(masks):
+        """Bounding boxes [x, y, w, h] of a stack of masks, computed on their device"""
+        masks = masks.flatten(0, -3)  # (N, H, W)
+        cols = masks.any(dim=-2).to(torch.uint8)
+        rows = masks.any(dim=-1).to(torch.uint8)
+        width, height = cols.shape[-1], rows.shape[-1]
+
+        # argmax returns the first maximal index, so scan from both ends
+        x_min = cols.argmax(dim=-1)
+        x_max = width - 1 - cols.flip(-1).argmax(dim=-1)
+        y_min = rows.argmax(dim=-1)
+        y_max = height - 1 - rows.flip(-1).argmax(dim=-1)
+
+        # Empty masks get [0, 0, 0, 0], matching COCODataset.mask_to_bbox
+        present = cols.amax(dim=-1).to(torch.int32)
+        return torch.stack([x_min, y_min, x_max - x_min + 1, y_max - y_min + 1], dim=-1).to(torch.int32) * present[:, None]
+
+    def _to_host(self, tensor):
+        """Start copying a device tensor to the host without blocking"""
+        if not tensor.is_cuda:
+            return tensor.cpu()
+        host = torch.empty(tensor.shape, dtype=tensor.dtype, pin_memory=True)
+        host.copy_(tensor, non_blocking=True)
+        return host
+
+    def run_through_video(self, on_batch=None):
+        """
+        Propagate the prompts through the video into video_segments and video_bboxes.
+        on_batch, when given, is called with the frame indices of each batch once it is stored.
+        """
         self.video_segments = {}
+        self.video_bboxes = {}
+        pending = []  # (frame_idx, obj_ids, host masks, host bboxes) with copies possibly in flight
         for out_frame_idx, out_obj_ids, out_mask_logits in self.predictor.propagate_in_video(self.inference_state):
-            self.video_segments[out_frame_idx] = {
-                out_obj_id: (out_mask_logits[i] > 0.0).cpu().numpy()
-                for i, out_obj_id in enumerate(out_obj_ids)
+            # Threshold and find boxes on the device, then start the copies without blocking propagation
+            masks = out_mask_logits > 0.0
+            bboxes = self._mask_bboxes(masks)
+            pending.append((out_frame_idx, list(out_obj_ids), self._to_host(masks), self._to_host(bboxes)))
+
+            if len(pending) >= TRANSFER_BATCH_FRAMES:
+                self._store_segments(pending, on_batch)
+        self._store_segments(pending, on_batch)
+
+    def _store_segments(self, pending, on_batch=None):
+        """Wait for queued device->host mask copies and move them into video_segments"""
+        if not pending:
+            return
+        if self.device.type == "cuda":
+            torch.cuda.current_stream().synchronize()
+        for frame_idx, obj_ids, host_masks, host_bboxes in pending:
+            masks = host_masks.numpy()
+            bboxes = host_bboxes.tolist()
+            self.mask_width = masks.shape[-1]
+            # Store 1 bit per pixel instead of a full byte per bool
+            self.video_segments[frame_idx] = {
+                out_obj_id: np.packbits(masks[i], axis=-1)
+                for i, out_obj_id in enumerate(obj_ids)
             }
+            self.video_bboxes[frame_idx] = dict(zip(obj_ids, bboxes))
+        if on_batch is not None:
+            on_batch([frame_idx for frame_idx, _, _, _ in pending])
+        pending.clear()
+
+    def get_mask(self, frame_idx, obj_id):
+        """Unpack the propagated mask for an object on a frame back to a bool array"""
+        packed = self.video_segments[frame_idx][obj_id]
+        return np.unpackbits(packed, axis=-1, count=self.mask_width).astype(bool)
 
@@ -2,25 +2,40 @@
 Pure data models for the video labeling application
 These models contain no UI or business logic dependencies
 """
+import hashlib
+import weakref
 from dataclasses import dataclass, field
 from typing import List, Dict, Optional, Tuple
 import numpy as np
 
 
-@dataclass
+@dataclass(slots=True)
 class ObjectDefinition:
     """Represents an object type that can be annotated"""
     id: int
     name: str
     color: Tuple[int, int, int] = (255, 0, 0)  # BGR color for visualization
+    # (alpha, color, alpha-scaled color) last computed by overlay_increment
+    _overlay_increment: Optional[Tuple[float, Tuple[int, int, int], Tuple[int, int, int]]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
     
-    def __post_init__(self):
-        """Ensure we have a valid color tuple"""
-        if not isinstance(self.color, tuple) or len(self.color) != 3:
-            self.color = (255, 0, 0)  # Default to blue
+    def overlay_increment(self, alpha: float) -> Tuple[int, int, int]:
+        """The color scaled by alpha, as added to masked pixels by the overlay; cached per alpha"""
+        cached = self._overlay_increment
+        if cached is None or cached[0] != alpha or cached[1] != self.color:
+            cached = self._overlay_increment = (alpha, self.color, tuple(round(c * alpha) for c in self.color))
+        return cached[2]
+    
+    @classmethod
+    def make(cls, id: int, name: str, color=(255, 0, 0)) -> "ObjectDefinition":
+        """Create an object definition from untrusted input, ensuring a valid color tuple"""
+        if not isinstance(color, tuple) or len(color) != 3:
+            color = (255, 0, 0)  # Default to blue
+        return cls(id, name, color)
 
 
-@dataclass
+@dataclass(slots=True)
 class Point:
     """Represents a point annotation"""
     x: int
@@ -30,16 +45,98 @@ class Point:
     object_id: int = 1  # Which object this point belongs to
 
 
-@dataclass
+class PointArrays:
+    """
+    Growable structure-of-arrays copy of a list of points, in the layout SAM2 takes:
+    (N, 2) float32 coordinates and (N,) int32 labels
+    """
+    
+    def __init__(self, capacity: int = 8):
+        self._coords = np.empty((capacity, 2), dtype=np.float32)
+        self._labels = np.empty(capacity, dtype=np.int32)
+        self._length = 0
+    
+    def __len__(self) -> int:
+        return self._length
+    
+    def append(self, point: Point):
+        """Append a point, doubling the capacity when full"""
+        if self._length == len(self._labels):
+            self._coords = np.concatenate((self._coords, np.empty_like(self._coords)))
+            self._labels = np.concatenate((self._labels, np.empty_like(self._labels)))
+        self._coords[self._length] = (point.x, point.y)
+        self._labels[self._length] = point.label
+        self._length += 1
+    
+    def pop(self):
+        """Drop the last point"""
+        self._length -= 1
+    
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Views of the (coords, labels) arrays; only valid until the next append/pop"""
+        return self._coords[:self._length], self._labels[:self._length]
+
+
+@dataclass(slots=True)
 class Mask:
-    """Represents a segmentation mask"""
-    mask_data: np.ndarray
+    """Represents a segmentation mask, stored bit-packed at 1 bit per pixel"""
+    packed: np.ndarray  # np.packbits of the mask along its last (width) axis
+    shape: Tuple[int, ...]  # shape of the unpacked mask
     object_id: int
     frame_index: int
     confidence: float = 1.0
+    bbox: Optional[List[int]] = None  # [x, y, w, h] when already known, e.g. computed on the GPU
+    
+    @classmethod
+    def from_array(cls, mask_data: np.ndarray, object_id: int, frame_index: int, **kwargs) -> "Mask":
+        """Create a mask from a binary array; any nonzero pixel counts as set"""
+        return cls(np.packbits(mask_data, axis=-1), mask_data.shape, object_id, frame_index, **kwargs)
+    
+    @property
+    def mask_data(self) -> np.ndarray:
+        """The mask unpacked to a bool array"""
+        return np.unpackbits(self.packed, axis=-1, count=self.shape[-1]).astype(bool)
+    
+    @mask_data.setter
+    def mask_data(self, mask_data: np.ndarray):
+        self.packed = np.packbits(mask_data, axis=-1)
+        self.shape = mask_data.shape
+    
+    def crop_u8(self, x: int, y: int, w: int, h: int) -> np.ndarray:
+        """
+        The (h, w) region at (x, y) unpacked to 0/1 uint8, usable directly as an OpenCV
+        operation mask; the rest of the mask stays packed
+        """
+        packed = self.packed.reshape(-1, self.packed.shape[-1])  # (H, W / 8), leading 1s dropped
+        first_byte = x // 8
+        bits = np.unpackbits(packed[y:y + h, first_byte:(x + w + 7) // 8], axis=-1)
+        offset = x - first_byte * 8
+        return bits[:, offset:offset + w]
+    
+    def is_empty(self) -> bool:
+        """Check for an all-zero mask without unpacking it"""
+        return not self.packed.any()
+    
+    def get_bbox(self) -> List[int]:
+        """Bounding box [x, y, w, h] of the mask, found from the packed bits when not already known"""
+        if self.bbox is not None:
+            return self.bbox
+        
+        packed = self.packed.reshape(-1, self.packed.shape[-1])  # (H, W / 8), leading 1s dropped
+        rows_any = packed.any(axis=1)
+        if not rows_any.any():
+            return [0, 0, 0, 0]
+        # OR the rows together byte-wise, so only one row is ever unpacked
+        cols_any = np.unpackbits(np.bitwise_or.reduce(packed, axis=0), count=self.shape[-1]).astype(bool)
+        
+        x_min = np.argmax(cols_any)
+        x_max = len(cols_any) - 1 - np.argmax(cols_any[::-1])
+        y_min = np.argmax(rows_any)
+        y_max = len(rows_any) - 1 - np.argmax(rows_any[::-1])
+        return [int(x_min), int(y_min), int(x_max - x_min + 1), int(y_max - y_min + 1)]
 
 
-@dataclass
+@dataclass(slots=True)
 class VideoInfo:
     """Video metadata and properties"""
     path: str
@@ -48,10 +145,28 @@ class VideoInfo:
     fps: float = 0.0
     total_frames: int = 0
     duration: float = 0.0
+    _resolution_string: str = field(default="", init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # width/height are fixed once the video is loaded, so format them once
+        self._resolution_string = f"{self.width}x{self.height}"
     
     @property
     def resolution_string(self) -> str:
-        return f"{self.width}x{self.height}"
+        return self._resolution_string
+
+
+# BGR palette that new objects cycle through
+DEFAULT_OBJECT_COLORS: Tuple[Tuple[int, int, int], ...] = (
+    (255, 0, 0),    # Blue
+    (0, 255, 0),    # Green
+    (0, 0, 255),    # Red
+    (255, 255, 0),  # Cyan
+    (255, 0, 255),  # Magenta
+    (0, 255, 255),  # Yellow
+    (128, 0, 128),  # Purple
+    (255, 165, 0),  # Orange
+)
 
 
 @dataclass
@@ -71,23 +186,35 @@ class AnnotationSession:
     current_object_id: Optional[int] = None  # Currently selected object for annotation
     next_object_id: int = 1  # Auto-incrementing object ID counter
     
+    # Annotation counts, maintained by add_point/remove_last_point and add_mask/remove_mask
+    point_count: int = field(default=0, init=False)
+    mask_count: int = field(default=0, init=False)
+    
+    # Point lookup indexes, kept in sync by add_point/remove_last_point
+    # frame_index -> points, and (frame_index, object_id) -> points, in insertion order
+    _points_by_frame: Dict[int, List[Point]] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _points_by_frame_obj: Dict[Tuple[int, int], List[Point]] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _point_arrays: Dict[Tuple[int, int], PointArrays] = field(default_factory=dict, init=False, repr=False, compare=False)
+    # Content hash -> mask array, so identical masks share one buffer; entries go away with their last Mask
+    _mask_pool: "weakref.WeakValueDictionary[bytes, np.ndarray]" = field(
+        default_factory=weakref.WeakValueDictionary, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        """Index and count any points and masks the session was created with"""
+        for point in self.points:
+            self._index_point(point)
+        self.point_count = len(self.points)
+        self.mask_count = sum(len(frame_masks) for frame_masks in self.masks.values())
+    
     def add_object(self, name: str, color: Optional[Tuple[int, int, int]] = None) -> ObjectDefinition:
         """Add a new object definition and return it"""
-        if color is None:
+        if color is not None:
+            obj_def = ObjectDefinition.make(self.next_object_id, name, color)
+        else:
             # Generate a color based on object ID
-            colors = [
-                (255, 0, 0),    # Blue
-                (0, 255, 0),    # Green  
-                (0, 0, 255),    # Red
-                (255, 255, 0),  # Cyan
-                (255, 0, 255),  # Magenta
-                (0, 255, 255),  # Yellow
-                (128, 0, 128),  # Purple
-                (255, 165, 0),  # Orange
-            ]
-            color = colors[self.next_object_id % len(colors)]
+            color = DEFAULT_OBJECT_COLORS[self.next_object_id % len(DEFAULT_OBJECT_COLORS)]
+            obj_def = ObjectDefinition(id=self.next_object_id, name=name, color=color)
         
-        obj_def = ObjectDefinition(id=self.next_object_id, name=name, color=color)
         self.objects[self.next_object_id] = obj_def
         
         # Set as current object if it's the first one
@@ -108,34 +235,81 @@ class AnnotationSession:
         if object_id in self.objects:
             self.current_object_id = object_id
     
+    def _index_point(self, point: Point):
+        """Add a point to the lookup indexes"""
+        self._points_by_frame.setdefault(point.frame_index, []).append(point)
+        self._points_by_frame_obj.setdefault((point.frame_index, point.object_id), []).append(point)
+        self._point_arrays.setdefault((point.frame_index, point.object_id), PointArrays()).append(point)
+    
+    def _unindex_point(self, point: Point):
+        """Remove the most recently indexed point from the lookup indexes"""
+        for index, key in ((self._points_by_frame, point.frame_index),
+                           (self._points_by_frame_obj, (point.frame_index, point.object_id)),
+                           (self._point_arrays, (point.frame_index, point.object_id))):
+            bucket = index[key]
+            bucket.pop()
+            if not bucket:
+                del index[key]
+    
     def add_point(self, point: Point):
         """Add a point annotation"""
         self.points.append(point)
+        self._index_point(point)
+        self.point_count += 1
     
     def remove_last_point(self) -> Optional[Point]:
         """Remove and return the last point annotation"""
         if self.points:
-            return self.points.pop()
+            point = self.points.pop()
+            self._unindex_point(point)
+            self.point_count -= 1
+            return point
         return None
     
+    def _intern_packed(self, mask: Mask) -> np.ndarray:
+        """Return a pooled packed array with the same contents as the mask's, pooling it if new"""
+        digest = hashlib.blake2b(np.ascontiguousarray(mask.packed), digest_size=16)
+        digest.update(repr(mask.shape).encode())
+        key = digest.digest()
+        
+        pooled = self._mask_pool.get(key)
+        if pooled is None:
+            self._mask_pool[key] = pooled = mask.packed
+        return pooled
+    
     def add_mask(self, mask: Mask):
         """Add a mask for a specific frame and object"""
+        mask.packed = self._intern_packed(mask)
         if mask.frame_index not in self.masks:
             self.masks[mask.frame_index] = {}
+        if mask.object_id not in self.masks[mask.frame_index]:
+            self.mask_count += 1
         self.masks[mask.frame_index][mask.object_id] = mask
     
+    def remove_mask(self, frame_index: int, object_id: int):
+        """Remove the mask of an object on a frame, if there is one"""
+        frame_masks = self.masks.get(frame_index)
+        if frame_masks and frame_masks.pop(object_id, None) is not None:
+            self.mask_count -= 1
+    
     def get_masks_for_frame(self, frame_index: int) -> Dict[int, Mask]:
         """Get all masks for a specific frame"""
         return self.masks.get(frame_index, {})
     
     def get_points_for_frame(self, frame_index: int) -> List[Point]:
         """Get all points for a specific frame"""
-        return [p for p in self.points if p.frame_index == frame_index]
+        return list(self._points_by_frame.get(frame_index, ()))
     
     def get_points_for_object_on_frame(self, frame_index: int, object_id: int) -> List[Point]:
         """Get all points for a specific object on a specific frame"""
-        return [p for p in self.points 
-                if p.frame_index == frame_index and p.object_id == object_id]
+        return list(self._points_by_frame_obj.get((frame_index, object_id), ()))
+    
+    def get_point_arrays_for_object_on_frame(self, frame_index: int, object_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Get (coords, labels) arrays of an object's points on a frame, ready for SAM2"""
+        point_arrays = self._point_arrays.get((frame_index, object_id))
+        if point_arrays is None:
+            return np.empty((0, 2), dtype=np.float32), np.empty(0, dtype=np.int32)
+        return point_arrays.arrays()
     
     def get_all_points_for_current_object_on_frame(self, frame_index: int) -> List[Point]:
         """Get all points for the current object on a specific frame"""
@@ -159,4 +333,4 @@ class ApplicationState:
     @property
     def has_annotations(self) -> bool:
         return (self.current_session is not None and 
-                (len(self.current_session.points) > 0 or len(self.current_session.masks) > 0))
+                (self.current_session.point_count > 0 or self.current_session.mask_count > 0))
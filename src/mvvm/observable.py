@@ -1,7 +1,7 @@
 """
 Observable pattern implementation for MVVM data binding
 """
-from typing import Any, Callable, Dict, List
+from typing import Any, Callable, Dict, List, Tuple
 from functools import wraps
 
 
@@ -10,6 +10,8 @@ class Observable:
     
     def __init__(self):
         self._observers: Dict[str, List[Callable]] = {}
+        # Snapshot of _observers as tuples, rebuilt on (un)subscribe so notifying is a single lookup
+        self._observer_cache: Dict[str, Tuple[Callable, ...]] = {}
         self._property_values: Dict[str, Any] = {}
     
     def add_observer(self, property_name: str, callback: Callable[[str, Any, Any], None]):
@@ -17,17 +19,18 @@ class Observable:
         if property_name not in self._observers:
             self._observers[property_name] = []
         self._observers[property_name].append(callback)
+        self._observer_cache[property_name] = tuple(self._observers[property_name])
     
     def remove_observer(self, property_name: str, callback: Callable):
         """Remove an observer for a specific property"""
         if property_name in self._observers:
             self._observers[property_name].remove(callback)
+            self._observer_cache[property_name] = tuple(self._observers[property_name])
     
     def notify_observers(self, property_name: str, old_value: Any, new_value: Any):
         """Notify all observers of a property change"""
-        if property_name in self._observers:
-            for callback in self._observers[property_name]:
-                callback(property_name, old_value, new_value)
+        for callback in self._observer_cache.get(property_name, ()):
+            callback(property_name, old_value, new_value)
 
 
 class ObservableProperty:
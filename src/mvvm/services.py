@@ -3,13 +3,35 @@ Services layer - business logic and external integrations
 These services are UI-agnostic and can be reused across different frontends
 """
 import os
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, List, Dict, Optional, Tuple, TYPE_CHECKING
 from .models import VideoInfo, Point, Mask, AnnotationSession
-from ..labeler.model import Labeler  # Import existing SAM2 labeler
 from ..labeler.dataset import COCODataset
 
+if TYPE_CHECKING:
+    from ..labeler.model import Labeler
+
+# Image files treated as extracted frames when clearing a frame directory
+FRAME_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Parallel frame extraction: at most this many decode streams, each covering at
+# least MIN_FRAMES_PER_CHUNK frames so short clips don't pay for extra seeks
+EXTRACT_WORKERS = min(8, os.cpu_count() or 1)
+MIN_FRAMES_PER_CHUNK = 32
+
+# get_frame steps forward with grab() instead of seeking when the target is at most this many frames ahead
+MAX_GRAB_SKIP = 60
+
+# Decoded frames kept for get_frame, and how far past the requested frame the
+# background prefetcher decodes ahead with its own capture
+FRAME_CACHE_SIZE = 32
+PREFETCH_FRAMES = 8
+
 
 class VideoService:
     """Service for video operations"""
@@ -17,12 +39,19 @@ class VideoService:
     def __init__(self):
         self.cap: Optional[cv2.VideoCapture] = None
         self.current_video: Optional[VideoInfo] = None
+        # LRU of decoded frames shared with the prefetch thread, guarded by _cache_lock
+        self._frame_cache: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._prefetch_queue: Optional[queue.Queue] = None
+        self._prefetch_thread: Optional[threading.Thread] = None
     
     def load_video(self, video_path: str) -> VideoInfo:
         """Load a video file and return video information"""
         if not os.path.exists(video_path):
             raise FileNotFoundError(f"Video file not found: {video_path}")
         
+        # Release the previous video's decoder before opening the next one
+        self.cleanup()
         self.cap = cv2.VideoCapture(video_path)
         if not self.cap.isOpened():
             raise ValueError(f"Cannot open video: {video_path}")
@@ -38,6 +67,14 @@ class VideoService:
         video_info.duration = video_info.total_frames / video_info.fps if video_info.fps > 0 else 0
         
         self.current_video = video_info
+        
+        self._prefetch_queue = queue.Queue()
+        self._prefetch_thread = threading.Thread(
+            target=self._prefetch_loop,
+            args=(video_path, video_info.total_frames, self._prefetch_queue),
+            daemon=True
+        )
+        self._prefetch_thread.start()
         return video_info
     
     def get_frame(self, frame_index: int) -> Optional[np.ndarray]:
@@ -48,11 +85,93 @@ class VideoService:
         # Ensure frame index is within bounds
         frame_index = max(0, min(frame_index, self.current_video.total_frames - 1))
         
-        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        with self._cache_lock:
+            frame = self._frame_cache.get(frame_index)
+            if frame is not None:
+                self._frame_cache.move_to_end(frame_index)
+        if frame is None:
+            frame = self._read_frame(frame_index)
+            if frame is not None:
+                self._cache_frame(frame_index, frame)
+        
+        self.prefetch(frame_index + 1)
+        return frame
+    
+    def prefetch(self, start_index: int):
+        """Ask the background decoder to fill the cache from start_index onward"""
+        if self._prefetch_queue is None or not self.current_video:
+            return
+        if start_index >= self.current_video.total_frames:
+            return
+        with self._cache_lock:
+            # Nothing to do while the whole window is already decoded
+            end = min(start_index + PREFETCH_FRAMES, self.current_video.total_frames)
+            if all(i in self._frame_cache for i in range(start_index, end)):
+                return
+        self._prefetch_queue.put(start_index)
+    
+    def _cache_frame(self, frame_index: int, frame: np.ndarray):
+        """Insert a decoded frame, evicting the least recently used ones"""
+        # Cached frames are handed out to every caller, so nobody may draw on them
+        frame.flags.writeable = False
+        with self._cache_lock:
+            self._frame_cache[frame_index] = frame
+            self._frame_cache.move_to_end(frame_index)
+            while len(self._frame_cache) > FRAME_CACHE_SIZE:
+                self._frame_cache.popitem(last=False)
+    
+    def _read_frame(self, frame_index: int) -> Optional[np.ndarray]:
+        """Decode a frame with the foreground capture"""
+        # A short step forward is cheaper to reach by grabbing (demuxing without
+        # converting) the frames in between than by seeking, which goes back to a keyframe
+        skip = frame_index - int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+        if 0 <= skip <= MAX_GRAB_SKIP:
+            for _ in range(skip):
+                if not self.cap.grab():
+                    break
+        else:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
         ret, frame = self.cap.read()
         
         return frame if ret else None
     
+    def _prefetch_loop(self, video_path: str, total_frames: int, requests: queue.Queue):
+        """Decode ahead of the foreground reads on a capture of our own"""
+        cap = cv2.VideoCapture(video_path)
+        position = 0
+        try:
+            while True:
+                start = requests.get()
+                # Only the most recent request matters; older ones are stale navigation
+                while start is not None and not requests.empty():
+                    start = requests.get_nowait()
+                if start is None:
+                    break
+                
+                # Backward jumps, long forward jumps and a capture that hit a read
+                # error re-seek (back to a keyframe); short steps forward just grab
+                if position is None or not 0 <= start - position <= MAX_GRAB_SKIP:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+                    position = start
+                
+                end = min(start + PREFETCH_FRAMES, total_frames)
+                while position < end and requests.empty():
+                    with self._cache_lock:
+                        cached = position in self._frame_cache
+                    # Frames before the window and already cached ones are skipped without converting
+                    if position < start or cached:
+                        ok = cap.grab()
+                    else:
+                        ok, frame = cap.read()
+                        if ok:
+                            self._cache_frame(position, frame)
+                    if not ok:
+                        position = None
+                        break
+                    position += 1
+        finally:
+            cap.release()
+    
     def extract_frames_to_directory(self, start_frame: int, output_dir: str) -> List[str]:
         """Extract frames from start_frame to end and save to directory"""
         if not self.cap or not self.current_video:
@@ -61,32 +180,74 @@ class VideoService:
         os.makedirs(output_dir, exist_ok=True)
         
         # Clear existing frames
-        for f in os.listdir(output_dir):
-            if f.lower().endswith(('.jpg', '.jpeg', '.png')):
-                os.remove(os.path.join(output_dir, f))
+        with os.scandir(output_dir) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(FRAME_EXTENSIONS) and entry.is_file(follow_symlinks=False):
+                    os.unlink(entry.path)
         
-        frame_paths = []
+        # Decode in contiguous chunks, each with its own capture, seeking once per chunk.
+        # A single capture decodes on roughly one core, so separate streams let decode
+        # and the JPEG encode (cv2 releases the GIL for both) run in parallel. self.cap
+        # is left alone for interactive get_frame use.
+        num_frames = max(0, self.current_video.total_frames - start_frame)
+        if num_frames == 0:
+            return []
+        num_chunks = max(1, min(EXTRACT_WORKERS, num_frames // MIN_FRAMES_PER_CHUNK))
+        chunk_size = -(-num_frames // num_chunks)
+        chunks = [(offset, min(chunk_size, num_frames - offset))
+                  for offset in range(0, num_frames, chunk_size)]
         
-        # SAM2 expects simple numeric filenames without prefixes
-        frame_counter = 0
-        for frame_idx in range(start_frame, self.current_video.total_frames):
-            frame = self.get_frame(frame_idx)
-            if frame is not None:
-                # Use simple numeric filename that SAM2 expects
-                filename = f"{frame_counter:05d}.jpg"
-                filepath = os.path.join(output_dir, filename)
-                cv2.imwrite(filepath, frame, [cv2.IMWRITE_JPEG_QUALITY, 100])
-                frame_paths.append(filename)  # Store just the filename for later reference
-                frame_counter += 1
+        video_path = self.current_video.path
+        def extract_chunk(chunk):
+            offset, length = chunk
+            cap = cv2.VideoCapture(video_path)
+            try:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame + offset)
+                for i in range(length):
+                    ret, frame = cap.read()
+                    if not ret:
+                        return i
+                    # Use simple numeric filename that SAM2 expects
+                    filepath = os.path.join(output_dir, f"{offset + i:05d}.jpg")
+                    cv2.imwrite(filepath, frame, [cv2.IMWRITE_JPEG_QUALITY, 100])
+                return length
+            finally:
+                cap.release()
+        
+        with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+            counts = list(executor.map(extract_chunk, chunks))
+        
+        # SAM2 expects simple numeric filenames without prefixes or gaps, so stop at the
+        # first frame that failed to decode and drop anything written after it
+        frame_paths = []
+        for (offset, length), count in zip(chunks, counts):
+            if len(frame_paths) < offset:
+                for i in range(count):
+                    os.unlink(os.path.join(output_dir, f"{offset + i:05d}.jpg"))
+                continue
+            frame_paths.extend(f"{offset + i:05d}.jpg" for i in range(count))  # Just the filenames
         
         return frame_paths
     
     def cleanup(self):
         """Clean up video resources"""
+        if self._prefetch_queue is not None:
+            self._prefetch_queue.put(None)
+            self._prefetch_thread.join()
+        self._prefetch_queue = None
+        self._prefetch_thread = None
+        with self._cache_lock:
+            self._frame_cache.clear()
         if self.cap:
             self.cap.release()
         self.cap = None
         self.current_video = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup()
 
 
 class AnnotationService:
@@ -94,57 +255,88 @@ class AnnotationService:
     
     def __init__(self, model_path: str = "sam2_checkpoint/sam2.1_hiera_large.pt"):
         self.model_path = model_path
-        self.labeler: Optional[Labeler] = None
+        self.labeler: Optional["Labeler"] = None
         self.frame_dir: Optional[str] = None
     
     def initialize_for_video(self, frame_dir: str):
         """Initialize SAM2 labeler for a video"""
         if not self.labeler:
+            # Import existing SAM2 labeler on first use; it pulls in torch and SAM2
+            from ..labeler.model import Labeler
             self.labeler = Labeler(self.model_path)
         
         # init_inference_state automatically resets, so we can reuse the same labeler
         self.labeler.init_inference_state(video_dir=frame_dir)
         self.frame_dir = frame_dir
     
-    def add_point_annotation(self, point: Point, all_points_for_object: List[Point]) -> Mask:
-        """Add a point annotation and return the generated mask using all points for the object"""
+    def add_point_annotation(self, point: Point, all_points_for_object: List[Point],
+                             point_arrays: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+                             frame_index: Optional[int] = None) -> Mask:
+        """
+        Add a point annotation and return the generated mask using all points for the object.
+        point_arrays, when given, holds the same points as (coords, labels) arrays.
+        frame_index, when given, is the SAM2 frame to annotate instead of point.frame_index.
+        """
         if not self.labeler:
             raise ValueError("Annotation service not initialized")
         
-        # Convert all points for this object to numpy arrays
-        points = np.array([[p.x, p.y] for p in all_points_for_object], dtype=np.float32)
-        labels = np.array([p.label for p in all_points_for_object], dtype=np.int32)
+        if point_arrays is not None:
+            points, labels = point_arrays
+        else:
+            # Convert all points for this object to numpy arrays
+            points = np.array([[p.x, p.y] for p in all_points_for_object], dtype=np.float32)
+            labels = np.array([p.label for p in all_points_for_object], dtype=np.int32)
+        
+        if frame_index is None:
+            frame_index = point.frame_index
         
         _, mask_data = self.labeler.select_objects(
             points=points,
             labels=labels,
             ann_obj_id=point.object_id,
-            ann_frame_idx=point.frame_index
+            ann_frame_idx=frame_index
         )
         
-        return Mask(
+        return Mask.from_array(
             mask_data=mask_data,
             object_id=point.object_id,
-            frame_index=point.frame_index
+            frame_index=frame_index
         )
     
-    def propagate_annotations(self) -> Dict[int, Dict[int, Mask]]:
-        """Run SAM2 propagation through the video"""
+    def propagate_annotations(self, on_frames: Optional[Callable[[Dict[int, Dict[int, Mask]]], None]] = None
+                              ) -> Dict[int, Dict[int, Mask]]:
+        """
+        Run SAM2 propagation through the video.
+        on_frames, when given, is called with each batch of frames' masks as soon as it is ready.
+        """
         if not self.labeler:
             raise ValueError("Annotation service not initialized")
         
-        self.labeler.run_through_video()
-        
-        # Convert SAM2 results to our mask format
         masks_by_frame = {}
-        for frame_idx, obj_masks in self.labeler.video_segments.items():
-            masks_by_frame[frame_idx] = {}
-            for obj_id, mask_data in obj_masks.items():
-                masks_by_frame[frame_idx][obj_id] = Mask(
-                    mask_data=mask_data,
-                    object_id=obj_id,
-                    frame_index=frame_idx
-                )
+        
+        def take_frames(frame_indices: List[int]):
+            # Convert SAM2 results to our mask format. The labeler already stores masks
+            # packed the same way Mask does, so the buffers are taken over as they are
+            batch = {}
+            for frame_idx in frame_indices:
+                obj_masks = self.labeler.video_segments.pop(frame_idx)
+                obj_bboxes = self.labeler.video_bboxes.pop(frame_idx)
+                batch[frame_idx] = {
+                    obj_id: Mask(
+                        packed=packed,
+                        shape=packed.shape[:-1] + (self.labeler.mask_width,),
+                        object_id=obj_id,
+                        frame_index=frame_idx,
+                        bbox=obj_bboxes[obj_id]
+                    )
+                    for obj_id, packed in obj_masks.items()
+                }
+            masks_by_frame.update(batch)
+            if on_frames is not None:
+                on_frames(batch)
+        
+        # Batches are popped from the labeler as they arrive, so the session ends up owning the masks
+        self.labeler.run_through_video(on_batch=take_frames)
         
         return masks_by_frame
 
@@ -160,37 +352,8 @@ class ExportService:
         if not session.video_info:
             raise ValueError("No video information available")
         
-        # Create COCO dataset
         dataset_name = f"{os.path.basename(session.video_info.path)}_annotations"
-        coco_dataset = COCODataset(dataset_name)
-        
-        # Add masks to dataset
-        for absolute_frame_idx, frame_masks in session.masks.items():
-            # Convert absolute frame index to relative (for extracted frames)
-            relative_frame_idx = absolute_frame_idx - session.start_frame
-            
-            for obj_id, mask in frame_masks.items():
-                # Skip empty masks (all zeros)
-                if not np.any(mask.mask_data):
-                    continue
-                
-                # Get object name
-                object_name = "unknown"
-                if obj_id in session.objects:
-                    object_name = session.objects[obj_id].name
-                
-                # Map relative frame index to extracted frame filename
-                if 0 <= relative_frame_idx < len(session.frame_paths):
-                    image_filename = session.frame_paths[relative_frame_idx]
-                    
-                    coco_dataset.add_sam_mask(
-                        mask=mask.mask_data,
-                        image_path=image_filename,
-                        object_name=object_name
-                    )
-        
-        # Export to JSON
-        coco_dataset.export_to_json(output_path)
+        self._export(session, output_path, dataset_name, session.masks.items())
         return output_path
     
     def export_to_coco_partial(self, session: AnnotationSession, output_path: str, end_frame: int):
@@ -198,39 +361,53 @@ class ExportService:
         if not session.video_info:
             raise ValueError("No video information available")
         
-        # Create COCO dataset
+        # Only export frames from start_frame to end_frame (inclusive)
+        frames = ((absolute_frame_idx, frame_masks)
+                  for absolute_frame_idx, frame_masks in session.masks.items()
+                  if session.start_frame <= absolute_frame_idx <= end_frame)
+        
         dataset_name = f"{os.path.basename(session.video_info.path)}_annotations_partial"
-        coco_dataset = COCODataset(dataset_name)
+        self._export(session, output_path, dataset_name, frames)
+        return output_path
+    
+    def _export(self, session: AnnotationSession, output_path: str, dataset_name: str, frames):
+        """
+        Write the (absolute_frame_idx, frame_masks) pairs in frames to a COCO file.
+        Entries are spooled to disk next to the output as they are added, so memory
+        use does not grow with the number of annotations.
+        """
+        # Look these up once rather than per mask
+        object_names = {obj_id: obj.name for obj_id, obj in session.objects.items()}
+        frame_paths = session.frame_paths
+        num_frame_paths = len(frame_paths)
+        start_frame = session.start_frame
         
-        # Add masks to dataset only for frames within the range
-        for absolute_frame_idx, frame_masks in session.masks.items():
-            # Only export frames from start_frame to end_frame (inclusive)
-            if not (session.start_frame <= absolute_frame_idx <= end_frame):
-                continue
-                
-            # Convert absolute frame index to relative (for extracted frames)
-            relative_frame_idx = absolute_frame_idx - session.start_frame
-            
-            for obj_id, mask in frame_masks.items():
-                # Skip empty masks (all zeros)
-                if not np.any(mask.mask_data):
+        # Create COCO dataset
+        coco_dataset = COCODataset(dataset_name, spool_prefix=output_path)
+        try:
+            # Add masks to dataset
+            for absolute_frame_idx, frame_masks in frames:
+                # Convert absolute frame index to relative (for extracted frames), and
+                # skip frames that have no extracted frame file
+                relative_frame_idx = absolute_frame_idx - start_frame
+                if not 0 <= relative_frame_idx < num_frame_paths:
                     continue
+                image_filename = frame_paths[relative_frame_idx]
                 
-                # Get object name
-                object_name = "unknown"
-                if obj_id in session.objects:
-                    object_name = session.objects[obj_id].name
-                
-                # Map relative frame index to extracted frame filename
-                if 0 <= relative_frame_idx < len(session.frame_paths):
-                    image_filename = session.frame_paths[relative_frame_idx]
+                for obj_id, mask in frame_masks.items():
+                    # Skip empty masks (all zeros)
+                    if mask.is_empty():
+                        continue
                     
-                    coco_dataset.add_sam_mask(
-                        mask=mask.mask_data,
+                    coco_dataset.add_sam_bbox(
+                        bbox=mask.get_bbox(),
                         image_path=image_filename,
-                        object_name=object_name
+                        width=mask.shape[-1],
+                        height=mask.shape[-2],
+                        object_name=object_names.get(obj_id, "unknown")
                     )
-        
-        # Export to JSON
-        coco_dataset.export_to_json(output_path)
-        return output_path
+            
+            # Export to JSON
+            coco_dataset.export_to_json(output_path)
+        finally:
+            coco_dataset.close()
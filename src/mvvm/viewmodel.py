@@ -3,7 +3,9 @@ ViewModel layer - Contains presentation logic and coordinates between Model and
 This ViewModel is UI-agnostic and can work with different frontend technologies
 """
 import os
-from typing import Optional, List, Dict, Callable
+import queue
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, List, Dict, Callable, Tuple
 import numpy as np
 import cv2
 
@@ -11,6 +13,13 @@ from .observable import Observable, ObservableProperty, Command
 from .models import VideoInfo, Point, Mask, AnnotationSession, ApplicationState, ObjectDefinition
 from .services import VideoService, AnnotationService, ExportService
 
+# BGR marker color indexed by label == 1: green for positive (1), red for any other label
+POINT_COLORS = ((0, 0, 255), (0, 255, 0))
+
+# Output buffers _draw_mask_overlay rotates through, so a composed frame stays intact
+# for this many compositions after it is returned
+OVERLAY_BUFFERS = 3
+
 
 class VideoLabelerViewModel(Observable):
     """
@@ -43,6 +52,8 @@ class VideoLabelerViewModel(Observable):
         self.previous_frame_command = Command(self._previous_frame, self._has_video)
         self.jump_to_frame_command = Command(self._jump_to_frame, self._has_video)
         self.add_point_command = Command(self._add_point, self._can_add_point)
+        self.queue_point_command = Command(self._queue_point, self._can_add_point)
+        self.flush_points_command = Command(self._flush_points)
         self.undo_point_command = Command(self._undo_last_point, self._can_undo_point)
         self.add_object_command = Command(self._add_object, self._has_video)
         self.select_object_command = Command(self._select_object, self._has_objects)
@@ -50,9 +61,33 @@ class VideoLabelerViewModel(Observable):
         self.export_coco_command = Command(self._export_coco, self._has_annotations)
         self.export_coco_partial_command = Command(self._export_coco_partial, self._has_annotations)
         
+        # SAM2 runs on a single worker thread so the UI keeps repainting; the worker hands
+        # results back as callbacks the view applies on its own thread via process_background_results
+        self._infer_executor = ThreadPoolExecutor(max_workers=1)
+        self._ui_callbacks: "queue.Queue[Callable[[], None]]" = queue.Queue()
+        self._last_job: Optional[Future] = None
+        self._jobs_in_flight = 0
+        # Annotation events raised while process_background_results runs; each name is
+        # sent once, with its latest payload, when the batch of results has been applied
+        self._deferred_events: Optional[Dict[str, object]] = None
+        
+        # Clicks (x, y, label) queued by queue_point_command, not yet sent to SAM2
+        self._pending_clicks: List[Tuple[int, int, int]] = []
+        
         # Current frame data
         self._current_frame: Optional[np.ndarray] = None
+        self._current_frame_loaded_index = -1  # frame index _current_frame was decoded for
         self._current_frame_with_overlay: Optional[np.ndarray] = None
+        self._overlay_key: Optional[Tuple[int, int]] = None  # (frame index, annotation version) of the cached overlay
+        self._annotation_version = 0  # bumped by _invalidate_overlay whenever annotations change
+        # Same for the masks-only composition, which point changes leave alone
+        self._current_frame_with_masks: Optional[np.ndarray] = None
+        self._masks_key: Optional[Tuple[int, int]] = None
+        self._mask_version = 0  # bumped by _invalidate_overlay when masks (or their colors) change
+        self._mask_scratch: Optional[np.ndarray] = None  # reusable mask color buffer for _draw_mask_overlay
+        self._prev_mask_region: Optional[Tuple[slice, slice]] = None  # part of _mask_scratch written last
+        self._overlay_pool: List[np.ndarray] = []  # reusable output buffers of _draw_mask_overlay
+        self._overlay_pool_index = 0
     
     # Properties for UI binding
     @property
@@ -76,7 +111,7 @@ class VideoLabelerViewModel(Observable):
     @property
     def has_annotations(self) -> bool:
         return (self.current_session is not None and 
-                (len(self.current_session.points) > 0 or len(self.current_session.masks) > 0))
+                (self.current_session.point_count > 0 or self.current_session.mask_count > 0))
     
     @property
     def needs_propagation(self) -> bool:
@@ -115,38 +150,102 @@ class VideoLabelerViewModel(Observable):
             return {}
         return self.current_session.get_masks_for_frame(self.current_frame_index)
     
+    @property
+    def overlay_key(self) -> Tuple[int, int]:
+        """
+        Identifies what get_current_frame_with_overlay shows: equal keys mean an identical image.
+        Frontends showing that overlay can pass it as the render key, as the Tkinter view
+        does with mask_overlay_key
+        """
+        return (self.current_frame_index, self._annotation_version)
+    
+    @property
+    def mask_overlay_key(self) -> Tuple[int, int]:
+        """Identifies what get_current_frame_with_masks shows: equal keys mean an identical image"""
+        return (self.current_frame_index, self._mask_version)
+    
     def get_current_frame(self) -> Optional[np.ndarray]:
         """Get current frame data for display"""
         if not self.has_video:
             return None
         
-        if self._current_frame is None:
+        # Keyed by index so observers notified mid-navigation never see the previous frame
+        if self._current_frame is None or self._current_frame_loaded_index != self.current_frame_index:
             self._current_frame = self.video_service.get_frame(self.current_frame_index)
+            self._current_frame_loaded_index = self.current_frame_index
         
         return self._current_frame
     
     def get_current_frame_with_overlay(self) -> Optional[np.ndarray]:
-        """Get current frame with annotations overlay"""
+        """
+        Get current frame with its masks and point markers drawn, for views that don't draw
+        points themselves (the Tkinter view draws them on its canvas and uses
+        get_current_frame_with_masks instead). The returned array must not be modified
+        """
+        # Reuse the last composed frame while neither the frame nor the annotations changed
+        key = self.overlay_key
+        if key == self._overlay_key:
+            return self._current_frame_with_overlay
+        
         base_frame = self.get_current_frame()
         if base_frame is None:
             return None
         
-        # Create a copy for overlay
-        frame_with_overlay = base_frame.copy()
+        masks = self.current_frame_masks
+        points = self.current_frame_points
+        if not points:
+            frame_with_overlay = self.get_current_frame_with_masks()
+        else:
+            # Add masks overlay (this also makes the copy we draw on)
+            frame_with_overlay = self._draw_mask_overlay(base_frame, masks)
+            
+            # Add points overlay
+            self._draw_points_overlay(frame_with_overlay, points)
         
-        # Add masks overlay
-        for obj_id, mask in self.current_frame_masks.items():
-            frame_with_overlay = self._draw_mask_overlay(frame_with_overlay, mask.mask_data, obj_id)
+        self._current_frame_with_overlay = frame_with_overlay
+        self._overlay_key = key
+        return frame_with_overlay
+    
+    def get_current_frame_with_masks(self) -> Optional[np.ndarray]:
+        """
+        Get current frame with only its masks drawn, for views that draw points themselves.
+        The returned array must not be modified
+        """
+        key = self.mask_overlay_key
+        if key == self._masks_key:
+            return self._current_frame_with_masks
         
-        # Add points overlay
-        for point in self.current_frame_points:
-            frame_with_overlay = self._draw_point_overlay(frame_with_overlay, point)
+        base_frame = self.get_current_frame()
+        if base_frame is None:
+            return None
         
-        return frame_with_overlay
+        masks = self.current_frame_masks
+        if not masks:
+            # Nothing to draw: hand out the decoded frame itself, which is read-only
+            frame_with_masks = base_frame
+        else:
+            frame_with_masks = self._draw_mask_overlay(base_frame, masks)
+        
+        self._current_frame_with_masks = frame_with_masks
+        self._masks_key = key
+        return frame_with_masks
+    
+    def _invalidate_overlay(self, masks: bool = True):
+        """
+        Mark the annotations as changed so the overlay is composed again.
+        masks=False when only points changed, so the masks-only composition stays valid
+        """
+        self._annotation_version += 1
+        self._current_frame_with_overlay = None
+        if masks:
+            self._mask_version += 1
+            self._current_frame_with_masks = None
     
     # Command implementations
     def _load_video(self, video_path: str):
         """Load a video file, preserving object classes if they exist"""
+        self._flush_points()
+        self._wait_for_background()
         try:
             self.status_message = "Loading video..."
             
@@ -176,8 +275,10 @@ class VideoLabelerViewModel(Observable):
             else:
                 self.status_message = f"Video loaded: {os.path.basename(video_path)}"
             
-            self.current_frame_index = 0
+            # Drop the previous video's frames before the frame change redraws the view
             self._current_frame = None
+            self._invalidate_overlay()
+            self.current_frame_index = 0
             
             self.notify_observers("video_loaded", None, video_info)
             
@@ -197,7 +298,6 @@ class VideoLabelerViewModel(Observable):
             self._propagate_if_needed()
             
             self.current_frame_index += 1
-            self._current_frame = None  # Force reload
     
     def _previous_frame(self):
         """Go to previous frame"""
@@ -206,7 +306,6 @@ class VideoLabelerViewModel(Observable):
             self._propagate_if_needed()
             
             self.current_frame_index -= 1
-            self._current_frame = None  # Force reload
     
     def _jump_to_frame(self, frame_index: int):
         """Jump to specific frame"""
@@ -216,35 +315,61 @@ class VideoLabelerViewModel(Observable):
             self._propagate_if_needed()
             
             self.current_frame_index = frame_index
-            self._current_frame = None  # Force reload
     
     def _add_point(self, x: int, y: int, label: int = 1):
         """Add a point annotation"""
+        self._add_points([(x, y, label)])
+    
+    def _queue_point(self, x: int, y: int, label: int = 1):
+        """
+        Queue a point annotation without running SAM2 yet. The caller is expected to
+        run flush_points_command shortly after, once a burst of clicks has settled.
+        """
+        self._pending_clicks.append((x, y, label))
+    
+    def _flush_points(self):
+        """Add all queued point annotations with a single SAM2 call"""
+        if not self._pending_clicks:
+            return
+        clicks, self._pending_clicks = self._pending_clicks, []
+        self._add_points(clicks)
+    
+    def _add_points(self, clicks: List[Tuple[int, int, int]]):
+        """Add (x, y, label) point annotations for the current object, then update its mask once"""
         if not self.current_session:
             return
         
+        # SAM2 is still busy: hold the clicks, they go out in one call when the worker is idle
+        if self.is_processing:
+            self._pending_clicks.extend(clicks)
+            return
+        
         # Check if an object is selected
         if self.current_session.current_object_id is None:
             self.status_message = "Please add and select an object first"
             return
         
         try:
-            self.is_processing = True
             self.status_message = "Processing annotation..."
             
             # Check if this is the first annotation
             if not self.current_session.is_initialized:
                 self._initialize_annotation_session()
             
-            # Create point with absolute frame index and current object ID
-            point = Point(
-                x=x, y=y, label=label, 
-                frame_index=self.current_frame_index,
-                object_id=self.current_session.current_object_id
-            )
+            # Create points with absolute frame index and current object ID
+            for x, y, label in clicks:
+                point = Point(
+                    x=x, y=y, label=label, 
+                    frame_index=self.current_frame_index,
+                    object_id=self.current_session.current_object_id
+                )
+                
+                # Add to session
+                self.current_session.add_point(point)
             
-            # Add to session
-            self.current_session.add_point(point)
+            # Show the new points right away; their mask follows once SAM2 is done
+            self._invalidate_overlay(masks=False)
+            self.notify_observers("points_changed", None, clicks)
             
             # Calculate relative frame index for SAM2 (relative to annotation start)
             relative_frame_idx = self.current_frame_index - self.current_session.start_frame
@@ -254,72 +379,151 @@ class VideoLabelerViewModel(Observable):
                 self.current_frame_index
             )
             
-            # Convert to relative frame indices for SAM2
-            relative_points = []
-            for p in all_points_for_object:
-                rel_frame_idx = p.frame_index - self.current_session.start_frame
-                relative_points.append(Point(
-                    x=p.x, y=p.y, label=p.label, 
-                    frame_index=rel_frame_idx, object_id=p.object_id
-                ))
-            
-            # Generate mask using annotation service with all points for this object
-            mask = self.annotation_service.add_point_annotation(
-                point=relative_points[-1],  # The new point (with relative frame index)
-                all_points_for_object=relative_points
-            )
-            
+            # Mark that we need to propagate when frame changes
+            self.current_session.needs_propagation = True
+        except Exception as e:
+            self.status_message = f"Error adding annotation: {str(e)}"
+            raise
+        
+        frame_index = self.current_frame_index
+        object_id = self.current_session.current_object_id
+        # The session's point buffers keep growing on this thread, so SAM2 gets its own copy
+        coords, labels = self.current_session.get_point_arrays_for_object_on_frame(frame_index, object_id)
+        point_arrays = (coords.copy(), labels.copy())
+        
+        def add_mask(mask: Mask):
             # Update mask to use absolute frame index for storage
-            mask.frame_index = self.current_frame_index
-            mask.object_id = self.current_session.current_object_id
+            mask.frame_index = frame_index
+            mask.object_id = object_id
             self.current_session.add_mask(mask)
             
-            # Force UI update to show immediate mask result - this will trigger observers
-            self._current_frame = None  # Force reload with overlay
-            self.notify_observers("annotation_added", None, {"point": point, "mask": mask})
+            # Force UI update to show immediate mask result - this will trigger observers.
+            # Only the overlay is redrawn; the decoded base frame is unchanged
+            self._invalidate_overlay()
+            self._notify_annotation_event("annotation_added", {"point": point, "mask": mask})
             
             point_type = "positive" if label == 1 else "negative"
             object_name = self.current_object_name
             self.status_message = f"Added {point_type} point for '{object_name}' at ({x}, {y})"
-            
-            # Mark that we need to propagate when frame changes
-            self.current_session.needs_propagation = True
-            
-        except Exception as e:
-            self.status_message = f"Error adding annotation: {str(e)}"
-            raise
-        finally:
-            self.is_processing = False
+        
+        # Generate mask using annotation service with all points for this object;
+        # SAM2 re-runs over the full point set, so one call covers every new click
+        self._run_in_background(
+            lambda: self.annotation_service.add_point_annotation(
+                point=all_points_for_object[-1],  # The new point
+                all_points_for_object=all_points_for_object,
+                point_arrays=point_arrays,
+                frame_index=relative_frame_idx
+            ),
+            add_mask,
+            "Error adding annotation"
+        )
     
     def _propagate_if_needed(self):
         """Propagate annotations through video if needed"""
+        self._flush_points()
         if not self.current_session or not self.current_session.needs_propagation:
             return
         
-        try:
-            self.is_processing = True
-            self.status_message = "Propagating annotations through video..."
-            
-            # Run propagation through the entire video
-            all_masks = self.annotation_service.propagate_annotations()
-            
-            # Update session with all masks, converting relative to absolute frame indices
-            for relative_frame_idx, frame_masks in all_masks.items():
-                absolute_frame_idx = self.current_session.start_frame + relative_frame_idx
+        self.status_message = "Propagating annotations through video..."
+        session = self.current_session
+        
+        def add_masks(frame_masks_by_frame: Dict[int, Dict[int, Mask]]):
+            # Update session with the masks, converting relative to absolute frame indices
+            shows_current_frame = False
+            for relative_frame_idx, frame_masks in frame_masks_by_frame.items():
+                absolute_frame_idx = session.start_frame + relative_frame_idx
+                shows_current_frame |= absolute_frame_idx == self.current_frame_index
                 for obj_id, mask in frame_masks.items():
                     # Update mask to use absolute frame index
                     mask.frame_index = absolute_frame_idx
-                    self.current_session.add_mask(mask)
-            
+                    session.add_mask(mask)
+            # Only the displayed frame needs redrawing
+            if shows_current_frame:
+                self._invalidate_overlay()
+                self._notify_annotation_event("annotation_added", None)
+        
+        def finish(_all_masks):
             # Clear the propagation flag
-            self.current_session.needs_propagation = False
+            session.needs_propagation = False
             self.status_message = "Video propagation complete"
-            
+        
+        # Run propagation through the entire video; each batch of frames is shown as
+        # soon as SAM2 finishes it rather than after the whole video
+        self._run_in_background(
+            lambda: self.annotation_service.propagate_annotations(
+                on_frames=lambda batch: self._ui_callbacks.put(lambda: add_masks(batch))
+            ),
+            finish,
+            "Error during propagation"
+        )
+    
+    def _run_in_background(self, job: Callable[[], object], on_done: Callable[[object], None],
+                           error_prefix: str):
+        """Run job on the inference worker, then on_done(result) on the UI thread"""
+        self._jobs_in_flight += 1
+        self.is_processing = True
+        
+        def run():
+            try:
+                result = job()
+            except Exception as e:
+                error = e
+                self._ui_callbacks.put(lambda: self._finish_background_job(None, error_prefix, error))
+            else:
+                self._ui_callbacks.put(lambda: self._finish_background_job(lambda: on_done(result), error_prefix))
+        
+        self._last_job = self._infer_executor.submit(run)
+    
+    def _finish_background_job(self, on_done: Optional[Callable[[], None]], error_prefix: str,
+                               error: Optional[Exception] = None):
+        """Apply a finished job's result, or report its error"""
+        try:
+            if error is not None:
+                raise error
+            on_done()
         except Exception as e:
-            self.status_message = f"Error during propagation: {str(e)}"
+            self.status_message = f"{error_prefix}: {str(e)}"
             raise
         finally:
-            self.is_processing = False
+            self._jobs_in_flight -= 1
+            if self._jobs_in_flight == 0:
+                self.is_processing = False
+                # Send the clicks that arrived while SAM2 was busy
+                self._flush_points()
+    
+    def process_background_results(self):
+        """Apply results delivered by the inference worker; call regularly from the UI thread"""
+        outermost = self._deferred_events is None
+        if outermost:
+            self._deferred_events = {}
+        try:
+            while True:
+                try:
+                    callback = self._ui_callbacks.get_nowait()
+                except queue.Empty:
+                    break
+                callback()
+        finally:
+            if outermost:
+                # One notification per event name, so the view redraws once per batch of results
+                events, self._deferred_events = self._deferred_events, None
+                for property_name, payload in events.items():
+                    self.notify_observers(property_name, None, payload)
+    
+    def _notify_annotation_event(self, property_name: str, payload):
+        """Notify observers of an annotation change, coalesced while results are being applied"""
+        if self._deferred_events is not None:
+            self._deferred_events[property_name] = payload
+        else:
+            self.notify_observers(property_name, None, payload)
+    
+    def _wait_for_background(self):
+        """Block until queued SAM2 work is done and its results are applied"""
+        if self._last_job is not None:
+            self._last_job.result()
+            self._last_job = None
+        self.process_background_results()
     
     def _initialize_annotation_session(self):
         """Initialize annotation session for SAM2"""
@@ -335,13 +539,22 @@ class VideoLabelerViewModel(Observable):
             self.current_frame_index, frame_dir
         )
         
-        # Initialize annotation service (init_inference_state automatically resets)
-        self.annotation_service.initialize_for_video(frame_dir)
+        # Update session with frame paths
+        session = self.current_session
+        session.start_frame = self.current_frame_index
+        session.frame_paths = frame_paths
+        
+        def initialized(_result):
+            session.is_initialized = True
         
-        # Update session with frame paths and initialization status
-        self.current_session.start_frame = self.current_frame_index
-        self.current_session.frame_paths = frame_paths
-        self.current_session.is_initialized = True
+        # Initialize annotation service (init_inference_state automatically resets). This
+        # loads SAM2 on the worker thread, which is also where the labeler's thread-local
+        # autocast context has to be entered for later inference to use it
+        self._run_in_background(
+            lambda: self.annotation_service.initialize_for_video(frame_dir),
+            initialized,
+            "Error initializing SAM2"
+        )
     
     def _propagate_annotations(self):
         """Manually trigger annotation propagation through video"""
@@ -354,6 +567,8 @@ class VideoLabelerViewModel(Observable):
     
     def _export_coco(self, output_path: str):
         """Export annotations in COCO format"""
+        self._flush_points()
+        self._wait_for_background()
         if not self.current_session:
             return
         
@@ -367,6 +582,8 @@ class VideoLabelerViewModel(Observable):
     
     def _export_coco_partial(self, output_path: str):
         """Export annotations in COCO format from start frame to current frame only"""
+        self._flush_points()
+        self._wait_for_background()
         if not self.current_session:
             return
         
@@ -382,11 +599,11 @@ class VideoLabelerViewModel(Observable):
     
     def _undo_last_point(self):
         """Undo the last point annotation"""
+        self._flush_points()
         if not self.current_session:
             return
         
         try:
-            self.is_processing = True
             self.status_message = "Undoing last point..."
             
             # Remove the last point
@@ -394,56 +611,61 @@ class VideoLabelerViewModel(Observable):
             if not removed_point:
                 self.status_message = "No points to undo"
                 return
+            self._invalidate_overlay(masks=False)
+            self.notify_observers("points_changed", None, removed_point)
             
             # Get remaining points for the current object on this frame
             remaining_points = self.current_session.get_all_points_for_current_object_on_frame(
                 self.current_frame_index
             )
             
-            if remaining_points:
-                # Re-generate mask with remaining points
-                relative_frame_idx = self.current_frame_index - self.current_session.start_frame
-                
-                # Convert to relative frame indices for SAM2
-                relative_points = []
-                for p in remaining_points:
-                    rel_frame_idx = p.frame_index - self.current_session.start_frame
-                    relative_points.append(Point(
-                        x=p.x, y=p.y, label=p.label, 
-                        frame_index=rel_frame_idx, object_id=p.object_id
-                    ))
-                
-                # Generate updated mask
-                mask = self.annotation_service.add_point_annotation(
-                    point=relative_points[-1],  # Use last remaining point as reference
-                    all_points_for_object=relative_points
-                )
-                
-                # Update mask to use absolute frame index for storage
-                mask.frame_index = self.current_frame_index
-                mask.object_id = self.current_session.current_object_id
-                self.current_session.add_mask(mask)
-            else:
-                # No points left for this object on this frame - remove mask
-                frame_masks = self.current_session.get_masks_for_frame(self.current_frame_index)
-                if self.current_session.current_object_id in frame_masks:
-                    del self.current_session.masks[self.current_frame_index][self.current_session.current_object_id]
-            
-            # Force UI update
-            self._current_frame = None  # Force reload with overlay
-            self.notify_observers("annotation_removed", None, {"removed_point": removed_point})
-            
-            point_type = "positive" if removed_point.label == 1 else "negative"
-            self.status_message = f"Undone {point_type} point at ({removed_point.x}, {removed_point.y})"
-            
             # Mark that we need to propagate when frame changes
             self.current_session.needs_propagation = True
-            
         except Exception as e:
             self.status_message = f"Error undoing point: {str(e)}"
             raise
-        finally:
-            self.is_processing = False
+        
+        frame_index = self.current_frame_index
+        object_id = self.current_session.current_object_id
+        
+        def point_undone():
+            # Force UI update; the overlay is recomposited onto the decoded frame already held
+            self._invalidate_overlay()
+            self._notify_annotation_event("annotation_removed", {"removed_point": removed_point})
+            
+            point_type = "positive" if removed_point.label == 1 else "negative"
+            self.status_message = f"Undone {point_type} point at ({removed_point.x}, {removed_point.y})"
+        
+        if not remaining_points:
+            # No points left for this object on this frame - remove mask
+            self.current_session.remove_mask(frame_index, object_id)
+            point_undone()
+            return
+        
+        # Re-generate mask with remaining points, at the frame index relative to annotation start
+        relative_frame_idx = self.current_frame_index - self.current_session.start_frame
+        
+        coords, labels = self.current_session.get_point_arrays_for_object_on_frame(frame_index, object_id)
+        point_arrays = (coords.copy(), labels.copy())
+        
+        def replace_mask(mask: Mask):
+            # Update mask to use absolute frame index for storage
+            mask.frame_index = frame_index
+            mask.object_id = object_id
+            self.current_session.add_mask(mask)
+            point_undone()
+        
+        # Generate updated mask
+        self._run_in_background(
+            lambda: self.annotation_service.add_point_annotation(
+                point=remaining_points[-1],  # Use last remaining point as reference
+                all_points_for_object=remaining_points,
+                point_arrays=point_arrays,
+                frame_index=relative_frame_idx
+            ),
+            replace_mask,
+            "Error undoing point"
+        )
     
     def _add_object(self, object_name: str):
         """Add a new object type for annotation"""
@@ -463,6 +685,7 @@ class VideoLabelerViewModel(Observable):
             
             # Add new object
             new_object = self.current_session.add_object(object_name.strip())
+            self._invalidate_overlay()  # masks drawn in the default color may now have one
             self.status_message = f"Added object '{new_object.name}' (ID: {new_object.id})"
             
             # Notify observers
@@ -474,6 +697,7 @@ class VideoLabelerViewModel(Observable):
     
     def _select_object(self, object_id: int):
         """Select an object for annotation"""
+        self._flush_points()
         if not self.current_session:
             return
         
@@ -496,12 +720,13 @@ class VideoLabelerViewModel(Observable):
         return self.has_video and not self.is_processing
     
     def _can_add_point(self) -> bool:
-        return (self.has_video and not self.is_processing and 
+        # Allowed while SAM2 is busy; _add_points holds such clicks until it is done
+        return (self.has_video and 
                 self.current_session and self.current_session.current_object_id is not None)
     
     def _can_undo_point(self) -> bool:
         return (self.has_video and not self.is_processing and 
-                self.current_session and len(self.current_session.points) > 0)
+                self.current_session and self.current_session.point_count > 0)
     
     def _has_objects(self) -> bool:
         return (self.has_video and not self.is_processing and 
@@ -515,30 +740,81 @@ class VideoLabelerViewModel(Observable):
         return self.has_annotations and not self.is_processing
     
     # Helper methods for visualization
-    def _draw_mask_overlay(self, frame: np.ndarray, mask: np.ndarray, object_id: int, alpha: float = 0.6) -> np.ndarray:
-        """Draw mask overlay on frame with object-specific color"""
-        # Get object color
-        color = (255, 0, 0)  # Default blue
-        if self.current_session and object_id in self.current_session.objects:
-            color = self.current_session.objects[object_id].color
-        
-        colored_mask = np.zeros_like(frame, dtype=np.uint8)
-        mask = np.squeeze(mask)
-        colored_mask[mask > 0] = color
-        return cv2.addWeighted(frame, 1.0, colored_mask, alpha, 0)
-    
-    def _draw_point_overlay(self, frame: np.ndarray, point: Point, marker_size: int = 8) -> np.ndarray:
-        """Draw point overlay on frame"""
-        color = (0, 255, 0) if point.label == 1 else (0, 0, 255)  # Green for positive, Red for negative
-        cv2.drawMarker(frame, (point.x, point.y), color, cv2.MARKER_STAR, 
-                      markerSize=marker_size, thickness=2)
-        # White border
-        cv2.drawMarker(frame, (point.x, point.y), (255, 255, 255), cv2.MARKER_STAR, 
-                      markerSize=marker_size, thickness=1)
+    def _draw_mask_overlay(self, frame: np.ndarray, masks: Dict[int, Mask], alpha: float = 0.6) -> np.ndarray:
+        """
+        Return a copy of frame with the masks tinted in their object-specific colors.
+        Each mask adds alpha * color to its pixels. The additions are collected in one
+        buffer and applied to the frame in a single saturating add; since every term
+        is non-negative this matches blending the objects one after another.
+        The copy lives in one of OVERLAY_BUFFERS buffers reused round-robin.
+        """
+        # The pool is only reallocated when the resolution changes
+        if not self._overlay_pool or self._overlay_pool[0].shape != frame.shape:
+            self._overlay_pool = [np.empty_like(frame) for _ in range(OVERLAY_BUFFERS)]
+        self._overlay_pool_index = (self._overlay_pool_index + 1) % OVERLAY_BUFFERS
+        frame_with_overlay = self._overlay_pool[self._overlay_pool_index]
+        # A cached composition still living in this buffer is about to be overwritten
+        if self._current_frame_with_masks is frame_with_overlay:
+            self._current_frame_with_masks = None
+            self._masks_key = None
+        if self._current_frame_with_overlay is frame_with_overlay:
+            self._current_frame_with_overlay = None
+            self._overlay_key = None
+        np.copyto(frame_with_overlay, frame)
+        
+        # Reuse the increment buffer between redraws; only the region written last
+        # time needs clearing
+        increments = self._mask_scratch
+        if increments is None or increments.shape != frame.shape:
+            increments = self._mask_scratch = np.zeros_like(frame)
+        elif self._prev_mask_region is not None:
+            increments[self._prev_mask_region] = 0
+        self._prev_mask_region = None
+        
+        objects = self.current_session.objects if self.current_session else {}
+        default_increment = tuple(round(c * alpha) for c in (255, 0, 0))  # Default blue
+        
+        # Only touch pixels inside each mask's bounding box, and their union at the end
+        x0 = y0 = np.iinfo(np.int32).max
+        x1 = y1 = -1
+        for object_id, mask in masks.items():
+            x, y, w, h = mask.get_bbox()
+            if w == 0:
+                continue
+            x0, y0, x1, y1 = min(x0, x), min(y0, y), max(x1, x + w), max(y1, y + h)
+            
+            # Get the object color, already scaled by alpha
+            obj = objects.get(object_id)
+            increment = obj.overlay_increment(alpha) if obj is not None else default_increment
+            roi = increments[y:y + h, x:x + w]
+            cv2.add(roi, increment, dst=roi, mask=mask.crop_u8(x, y, w, h))
+        
+        if x1 >= 0:
+            region = (slice(y0, y1), slice(x0, x1))
+            cv2.add(frame[region], increments[region], dst=frame_with_overlay[region])
+            self._prev_mask_region = region
+        return frame_with_overlay
+    
+    def _draw_points_overlay(self, frame: np.ndarray, points: List[Point], marker_size: int = 8) -> np.ndarray:
+        """
+        Draw point markers on frame in place, in point order so overlaps look the same.
+        Used by get_current_frame_with_overlay
+        """
+        draw_marker = cv2.drawMarker
+        star = cv2.MARKER_STAR
+        white = (255, 255, 255)
+        for point in points:
+            position = (point.x, point.y)
+            draw_marker(frame, position, POINT_COLORS[point.label == 1], star, markerSize=marker_size, thickness=2)
+            # White border
+            draw_marker(frame, position, white, star, markerSize=marker_size, thickness=1)
         return frame
     
     def cleanup(self):
         """Clean up resources"""
+        self._wait_for_background()
+        self._infer_executor.shutdown()
         self.video_service.cleanup()
         self.current_session = None
         self._current_frame = None
+        self._invalidate_overlay()
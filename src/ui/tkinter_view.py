@@ -9,8 +9,32 @@ import numpy as np
 import cv2
 from typing import Optional
 import os
+import queue
+import threading
+from collections import OrderedDict
 
-from ..mvvm.viewmodel import VideoLabelerViewModel
+from ..mvvm.viewmodel import VideoLabelerViewModel, POINT_COLORS
+
+# Clicks arriving within this many ms of each other share one SAM2 call
+CLICK_COALESCE_MS = 30
+
+# How often the main loop applies SAM2 results finished on the viewmodel's worker thread
+BACKGROUND_POLL_MS = 15
+
+# Display-sized renders kept by VideoCanvas, so stepping back and forth between
+# recently shown frames redraws without converting and resizing again
+RENDER_CACHE_SIZE = 4
+
+# How often the Tk loop checks for a frame resized by VideoCanvas' render thread
+RENDER_POLL_MS = 5
+
+# Frames changing less than this many ms apart (slider drags, held arrow keys) are resized
+# with cheap bilinear filtering; once changes settle, the frame is redrawn with Lanczos
+DRAFT_SETTLE_MS = 150
+
+# Point markers are canvas items drawn over the frame, so adding a point doesn't re-render it
+POINT_MARKER_SIZE = 8
+POINT_MARKER_COLORS = tuple('#%02x%02x%02x' % (r, g, b) for b, g, r in POINT_COLORS)  # from BGR
 
 
 class VideoCanvas(tk.Canvas):
@@ -21,119 +45,323 @@ class VideoCanvas(tk.Canvas):
         self.viewmodel = viewmodel
         self.current_image = None
         self.photo_image = None
+        self._rgb_buffer: Optional[np.ndarray] = None  # reused output of the BGR to RGB conversion
+        self._fit_cache = None  # (source and canvas sizes, display size and prefilter factor)
+        # (image key, canvas size) -> (PhotoImage, resized PIL image), least recently shown first
+        self._render_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._spare_photo = None  # PhotoImage evicted from the cache, pasted into by the next render
+        # Where the shown image sits: (left, top, width, height, video px per canvas px x, y).
+        # Only changes when a frame is shown, so clicks don't query Tk for sizes
+        self._image_transform: Optional[tuple] = None
+        self._image_item = None  # canvas item showing the frame, reused for every frame
+        self._image_xy = None  # where _image_item is placed
+        self._flush_after_id = None  # pending Tk after() call that flushes queued clicks
+        self._repaint_after_id = None  # pending Tk after_idle() call that redraws the frame
+        self._settle_after_id = None  # pending Tk after() call that ends draft rendering
+        self._draft = False  # render with bilinear filtering while frames change quickly
+        
+        # Converting and resizing run on a render thread so large frames don't stall input.
+        # Each update_frame call gets a sequence number; a finished render is shown only if
+        # nothing newer has been shown already
+        self._render_requests: queue.Queue = queue.Queue(maxsize=1)  # newest unstarted job only
+        self._render_lock = threading.Lock()
+        self._render_result = None  # (seq, cache key, PIL image, canvas size) from the render thread
+        self._render_poll_id = None
+        self._display_seq = 0  # sequence number of the latest update_frame call
+        self._shown_seq = 0  # sequence number of the frame currently on the canvas
+        threading.Thread(target=self._render_loop, daemon=True).start()
         
         # Bind mouse events
         self.bind("<Button-1>", self._on_left_click)
         self.bind("<Button-3>", self._on_right_click)
+        self.bind("<Configure>", self._on_configure)
         
         # Listen to viewmodel changes
         self.viewmodel.add_observer("current_frame_index", self._on_frame_changed)
         self.viewmodel.add_observer("annotation_added", self._on_annotation_added)
         self.viewmodel.add_observer("annotation_removed", self._on_annotation_removed)
-    
-    def update_frame(self, frame: Optional[np.ndarray]):
-        """Update the canvas with a new frame"""
+        self.viewmodel.add_observer("points_changed", self._on_points_changed)
+    
+    def update_frame(self, frame: Optional[np.ndarray], key=None):
+        """
+        Update the canvas with a new frame. key, when given, identifies the frame's content
+        (see VideoLabelerViewModel.overlay_key) so a render of the same image can be reused.
+        """
+        self._display_seq += 1
         if frame is None:
+            self._shown_seq = self._display_seq
+            self._image_transform = None
+            self._image_item = None
             self.delete("all")
             return
         
-        # Convert BGR to RGB for PIL
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # Convert to PIL Image
-        pil_image = Image.fromarray(frame_rgb)
-        
-        # Resize to fit canvas while maintaining aspect ratio
         canvas_width = self.winfo_width()
         canvas_height = self.winfo_height()
+        draft = self._draft
+        cache_key = (key, canvas_width, canvas_height, draft) if key is not None else None
+        cached = None
+        if cache_key is not None:
+            # A full quality render is just as good while drafting
+            if draft and (key, canvas_width, canvas_height, False) in self._render_cache:
+                cache_key = (key, canvas_width, canvas_height, False)
+            cached = self._render_cache.get(cache_key)
+        if cached is not None:
+            self._render_cache.move_to_end(cache_key)
+            self._shown_seq = self._display_seq
+            self._show_photo(*cached, canvas_width, canvas_height)
+            return
         
-        if canvas_width > 1 and canvas_height > 1:  # Canvas is initialized
-            # Calculate scaling to fit canvas
-            img_width, img_height = pil_image.size
-            scale_x = canvas_width / img_width
-            scale_y = canvas_height / img_height
-            scale = min(scale_x, scale_y)
+        # Read-only frames come straight from the decoder cache and never change; anything
+        # else may be a reused overlay buffer, so the render thread gets its own copy
+        if frame.flags.writeable:
+            frame = frame.copy()
+        
+        # Replace a job the render thread hasn't started yet; only the newest frame matters
+        try:
+            self._render_requests.get_nowait()
+        except queue.Empty:
+            pass
+        self._render_requests.put_nowait((self._display_seq, cache_key, frame, canvas_width, canvas_height, draft))
+        if self._render_poll_id is None:
+            self._render_poll_id = self.after(RENDER_POLL_MS, self._collect_render)
+    
+    def _render_loop(self):
+        """Render thread: resize queued frames for display"""
+        while True:
+            seq, cache_key, frame, canvas_width, canvas_height, draft = self._render_requests.get()
+            pil_image = self._render(frame, canvas_width, canvas_height, draft)
+            with self._render_lock:
+                self._render_result = (seq, cache_key, pil_image, canvas_width, canvas_height)
+    
+    def _collect_render(self):
+        """Show the render thread's latest frame; keep polling until the newest request is shown"""
+        self._render_poll_id = None
+        with self._render_lock:
+            result, self._render_result = self._render_result, None
+        
+        if result is not None:
+            seq, cache_key, pil_image, canvas_width, canvas_height = result
             
-            new_width = int(img_width * scale)
-            new_height = int(img_height * scale)
+            # Convert to PhotoImage for tkinter (Tk objects are only touched on this thread).
+            # While scrubbing every render evicts one, so paste into the evicted image
+            # instead of creating and freeing a Tk image per frame
+            spare, self._spare_photo = self._spare_photo, None
+            if spare is not None and (spare.width(), spare.height()) == pil_image.size:
+                spare.paste(pil_image)
+                photo_image = spare
+            else:
+                photo_image = ImageTk.PhotoImage(pil_image)
+            if cache_key is not None:
+                self._render_cache[cache_key] = (photo_image, pil_image)
+                if len(self._render_cache) > RENDER_CACHE_SIZE:
+                    evicted, _ = self._render_cache.popitem(last=False)[1]
+                    if evicted is not self.photo_image:
+                        self._spare_photo = evicted
             
-            pil_image = pil_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+            if seq > self._shown_seq:
+                self._shown_seq = seq
+                self._show_photo(photo_image, pil_image, canvas_width, canvas_height)
         
-        # Convert to PhotoImage for tkinter
-        self.photo_image = ImageTk.PhotoImage(pil_image)
+        if self._shown_seq < self._display_seq:
+            self._render_poll_id = self.after(RENDER_POLL_MS, self._collect_render)
+    
+    def _render(self, frame: np.ndarray, canvas_width: int, canvas_height: int,
+                draft: bool = False) -> Image.Image:
+        """Convert a BGR frame to a PIL image fitted to the canvas; draft trades quality for speed"""
+        # Resize to fit canvas while maintaining aspect ratio
+        if canvas_width > 1 and canvas_height > 1:  # Canvas is initialized
+            img_height, img_width = frame.shape[:2]
+            new_size, factor = self._fit_size(img_width, img_height, canvas_width, canvas_height)
+            if factor >= 2:
+                frame = cv2.resize(frame, (img_width // factor, img_height // factor),
+                                   interpolation=cv2.INTER_AREA)
+            # Resizing the ndarray with OpenCV avoids a round trip through a full-size PIL image.
+            # Bilinear is about 10x cheaper than Lanczos and can't be told apart while scrubbing
+            interpolation = cv2.INTER_LINEAR if draft else cv2.INTER_LANCZOS4
+            frame = cv2.resize(frame, new_size, interpolation=interpolation)
+        
+        # Convert BGR to RGB for PIL, at display size. cvtColor's SIMD pass is far quicker than
+        # copying a reversed-channel view (frame[..., ::-1]) into the contiguous layout PIL
+        # needs, so keep it, but write into a reused buffer; fromarray copies out of it anyway
+        if self._rgb_buffer is None or self._rgb_buffer.shape != frame.shape:
+            self._rgb_buffer = np.empty_like(frame)
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb_buffer)
         
-        # Clear canvas and add image
-        self.delete("all")
-        self.create_image(
-            canvas_width // 2, canvas_height // 2,
-            image=self.photo_image,
-            anchor=tk.CENTER
-        )
+        # Convert to PIL Image
+        return Image.fromarray(frame_rgb)
+    
+    def _fit_size(self, img_width: int, img_height: int, canvas_width: int, canvas_height: int):
+        """Display size and prefilter factor for fitting an image to the canvas"""
+        # Sizes only change on resize or a new video, so reuse the last answer
+        sizes = (img_width, img_height, canvas_width, canvas_height)
+        if self._fit_cache is not None and self._fit_cache[0] == sizes:
+            return self._fit_cache[1]
+        
+        # Calculate scaling to fit canvas while maintaining aspect ratio
+        scale_x = canvas_width / img_width
+        scale_y = canvas_height / img_height
+        scale = min(scale_x, scale_y)
+        
+        new_size = (int(img_width * scale), int(img_height * scale))
+        
+        # For large reductions, box-filter down by an integer factor first so Lanczos
+        # only refines the last step and runs over a fraction of the pixels
+        factor = int(1 / scale) if scale > 0 else 1
+        
+        self._fit_cache = (sizes, (new_size, factor))
+        return new_size, factor
+    
+    def _show_photo(self, photo_image, pil_image, canvas_width: int, canvas_height: int):
+        """Put a rendered frame on the canvas"""
+        self.photo_image = photo_image
+        
+        # Center the image; its top-left corner is the same one clicks are mapped from
+        img_width, img_height = pil_image.size
+        img_x = (canvas_width - img_width) // 2
+        img_y = (canvas_height - img_height) // 2
+        
+        # Keep one image item and swap its picture, rather than rebuilding the canvas per frame
+        if self._image_item is None:
+            self._image_item = self.create_image(img_x, img_y, image=self.photo_image, anchor=tk.NW)
+            self._image_xy = (img_x, img_y)
+        else:
+            self.itemconfigure(self._image_item, image=self.photo_image)
+            if self._image_xy != (img_x, img_y):
+                self.coords(self._image_item, img_x, img_y)
+                self._image_xy = (img_x, img_y)
         
         self.current_image = pil_image
+        self._image_transform = None
+        if self.viewmodel.video_info:
+            self._image_transform = (
+                img_x, img_y,
+                img_width, img_height,
+                self.viewmodel.video_info.width / img_width,
+                self.viewmodel.video_info.height / img_height,
+            )
+        self._draw_points()
+    
+    def _draw_points(self):
+        """Draw the current frame's points as star markers over the displayed image"""
+        self.delete("points")
+        if self._image_transform is None:
+            return
+        
+        # Same placement as _canvas_to_image_coords uses for clicks
+        img_x, img_y, _, _, to_video_x, to_video_y = self._image_transform
+        scale_x = 1 / to_video_x
+        scale_y = 1 / to_video_y
+        
+        half = POINT_MARKER_SIZE // 2
+        for point in self.viewmodel.current_frame_points:
+            x = img_x + (point.x + 0.5) * scale_x
+            y = img_y + (point.y + 0.5) * scale_y
+            strokes = (
+                (x - half, y, x + half, y),
+                (x, y - half, x, y + half),
+                (x - half, y - half, x + half, y + half),
+                (x - half, y + half, x + half, y - half),
+            )
+            # Colored star with a white core, like the markers drawn into the frame
+            color = POINT_MARKER_COLORS[point.label == 1]
+            for stroke in strokes:
+                self.create_line(*stroke, fill=color, width=2, tags="points")
+            for stroke in strokes:
+                self.create_line(*stroke, fill="white", width=1, tags="points")
     
     def _on_left_click(self, event):
         """Handle left mouse click - add positive point"""
         x, y = self._canvas_to_image_coords(event.x, event.y)
         if x is not None and y is not None:
-            self.viewmodel.add_point_command.execute(x, y, 1)  # Positive point
+            self._queue_point(x, y, 1)  # Positive point
     
     def _on_right_click(self, event):
         """Handle right mouse click - add negative point"""
         x, y = self._canvas_to_image_coords(event.x, event.y)
         if x is not None and y is not None:
-            self.viewmodel.add_point_command.execute(x, y, 0)  # Negative point
+            self._queue_point(x, y, 0)  # Negative point
+    
+    def _queue_point(self, x: int, y: int, label: int):
+        """Queue a point and (re)start the timer that sends queued points to SAM2"""
+        if not self.viewmodel.queue_point_command.can_execute():
+            return
+        self.viewmodel.queue_point_command.execute(x, y, label)
+        
+        # Clicks made while SAM2 is busy are held by the viewmodel and sent together
+        # once it is done
+        if self._flush_after_id is not None:
+            self.after_cancel(self._flush_after_id)
+        self._flush_after_id = self.after(CLICK_COALESCE_MS, self._flush_points)
+    
+    def _flush_points(self):
+        """Send queued points to SAM2"""
+        self._flush_after_id = None
+        self.viewmodel.flush_points_command.execute()
     
     def _canvas_to_image_coords(self, canvas_x: int, canvas_y: int):
         """Convert canvas coordinates to image coordinates"""
-        if not self.current_image or not self.viewmodel.video_info:
+        if self._image_transform is None:
             return None, None
         
-        canvas_width = self.winfo_width()
-        canvas_height = self.winfo_height()
-        
-        # Get current image size on canvas
-        img_width, img_height = self.current_image.size
-        
-        # Calculate image position on canvas (centered)
-        img_x = (canvas_width - img_width) // 2
-        img_y = (canvas_height - img_height) // 2
+        # Image position and scale on canvas, worked out when the frame was shown
+        img_x, img_y, img_width, img_height, scale_x, scale_y = self._image_transform
         
         # Check if click is within image bounds
         if (canvas_x < img_x or canvas_x >= img_x + img_width or
             canvas_y < img_y or canvas_y >= img_y + img_height):
             return None, None
         
-        # Convert to image coordinates
-        rel_x = canvas_x - img_x
-        rel_y = canvas_y - img_y
-        
-        # Scale to original image size
-        original_width = self.viewmodel.video_info.width
-        original_height = self.viewmodel.video_info.height
-        
-        scale_x = original_width / img_width
-        scale_y = original_height / img_height
-        
-        image_x = int(rel_x * scale_x)
-        image_y = int(rel_y * scale_y)
+        # Convert to image coordinates, scaled to original image size
+        image_x = int((canvas_x - img_x) * scale_x)
+        image_y = int((canvas_y - img_y) * scale_y)
         
         return image_x, image_y
     
+    def _on_configure(self, event):
+        """Refit the shown frame when the canvas is resized"""
+        if self.current_image is not None:
+            self._schedule_repaint()
+    
     def _on_frame_changed(self, property_name: str, old_value, new_value):
         """Handle frame change from viewmodel"""
-        frame = self.viewmodel.get_current_frame_with_overlay()
-        self.update_frame(frame)
+        # A change while the previous one is still settling means frames are being scrubbed
+        if self._settle_after_id is not None:
+            self.after_cancel(self._settle_after_id)
+            self._draft = True
+        self._settle_after_id = self.after(DRAFT_SETTLE_MS, self._finish_draft)
+        self._schedule_repaint()
+    
+    def _finish_draft(self):
+        """Frames stopped changing - redraw the last one at full quality"""
+        self._settle_after_id = None
+        if self._draft:
+            self._draft = False
+            self._schedule_repaint()
     
     def _on_annotation_added(self, property_name: str, old_value, new_value):
-        """Handle new annotation added - immediately show the point and mask"""
-        frame = self.viewmodel.get_current_frame_with_overlay()
-        self.update_frame(frame)
+        """Handle new annotation added - show the point and mask"""
+        self._schedule_repaint()
     
     def _on_annotation_removed(self, property_name: str, old_value, new_value):
         """Handle annotation removed - update the display"""
-        frame = self.viewmodel.get_current_frame_with_overlay()
-        self.update_frame(frame)
+        self._schedule_repaint()
+    
+    def _on_points_changed(self, property_name: str, old_value, new_value):
+        """Handle points added or removed ahead of their mask - only the markers change"""
+        self._draw_points()
+    
+    def _schedule_repaint(self):
+        """Redraw once Tk is idle, so changes arriving in the same event cycle share one repaint"""
+        if self._repaint_after_id is None:
+            self._repaint_after_id = self.after_idle(self._repaint)
+    
+    def _repaint(self):
+        """Redraw the current frame with its annotations"""
+        self._repaint_after_id = None
+        # Points are canvas items, so the image only changes with the frame or its masks
+        frame = self.viewmodel.get_current_frame_with_masks()
+        self.update_frame(frame, self.viewmodel.mask_overlay_key)
+        self._draw_points()
 
 
 class ControlPanel(ttk.Frame):
@@ -524,6 +752,7 @@ class VideoLabelerApp(tk.Tk):
         
         self._setup_ui()
         self._setup_bindings()
+        self._poll_background_results()
     
     def _setup_ui(self):
         """Setup the main UI layout"""
@@ -561,6 +790,13 @@ class VideoLabelerApp(tk.Tk):
         # Make sure the window can receive focus for key events
         self.focus_set()
     
+    def _poll_background_results(self):
+        """Hand finished SAM2 work back to the viewmodel on the Tk thread"""
+        try:
+            self.viewmodel.process_background_results()
+        finally:
+            self.after(BACKGROUND_POLL_MS, self._poll_background_results)
+    
     def run(self):
         """Start the application"""
         try:
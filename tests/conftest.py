@@ -0,0 +1,21 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+# Import the app packages the same way run_labeler.py does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+
+@pytest.fixture
+def video_path(tmp_path):
+    """A short 160x120 video whose frame i is filled with gray level 10 * i"""
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (160, 120))
+    for i in range(12):
+        writer.write(np.full((120, 160, 3), 10 * i, np.uint8))
+    writer.release()
+    return path
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from src.mvvm.services import VideoService
+
+
+@pytest.fixture
+def video_service(video_path):
+    service = VideoService()
+    service.load_video(video_path)
+    yield service
+    service.cleanup()
+
+
+def test_extract_frames_writes_numbered_frames(video_service, tmp_path):
+    output_dir = tmp_path / "frames"
+    
+    frame_paths = video_service.extract_frames_to_directory(4, str(output_dir))
+    
+    assert frame_paths == [f"{i:05d}.jpg" for i in range(8)]
+    assert sorted(os.listdir(output_dir)) == frame_paths
+
+
+def test_extract_frames_past_the_end_is_empty(video_service, tmp_path):
+    output_dir = tmp_path / "frames"
+    output_dir.mkdir()
+    (output_dir / "00000.jpg").write_bytes(b"stale")
+    
+    total = video_service.current_video.total_frames
+    
+    assert video_service.extract_frames_to_directory(total, str(output_dir)) == []
+    assert video_service.extract_frames_to_directory(total + 5, str(output_dir)) == []
+    assert os.listdir(output_dir) == []
@@ -0,0 +1,129 @@
+import threading
+
+import numpy as np
+import pytest
+
+from src.mvvm.models import Mask, Point
+from src.mvvm.viewmodel import VideoLabelerViewModel, OVERLAY_BUFFERS, POINT_COLORS
+
+
+class FakeAnnotationService:
+    """Stands in for SAM2: returns a box mask around the last point, optionally after a gate opens"""
+    
+    def __init__(self):
+        self.gate = threading.Event()
+        self.gate.set()
+        self.calls = []  # point counts seen per add_point_annotation call
+    
+    def initialize_for_video(self, frame_dir):
+        self.gate.wait(5)
+    
+    def add_point_annotation(self, point, all_points_for_object, point_arrays=None, frame_index=None):
+        self.gate.wait(5)
+        self.calls.append(len(all_points_for_object))
+        data = np.zeros((120, 160), bool)
+        data[max(point.y - 10, 0):point.y + 10, max(point.x - 10, 0):point.x + 10] = True
+        return Mask.from_array(data, point.object_id, frame_index)
+    
+    def propagate_annotations(self, on_frames=None):
+        return {}
+
+
+@pytest.fixture
+def viewmodel(video_path, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # frames are extracted relative to the working directory
+    vm = VideoLabelerViewModel()
+    vm.annotation_service = FakeAnnotationService()
+    vm.load_video_command.execute(video_path)
+    vm.add_object_command.execute("gate")
+    yield vm
+    vm.annotation_service.gate.set()
+    vm.cleanup()
+
+
+def test_points_clicked_while_busy_are_kept(viewmodel):
+    service = viewmodel.annotation_service
+    service.gate.clear()
+    viewmodel.add_point_command.execute(20, 20, 1)
+    assert viewmodel.is_processing
+    
+    # Clicks made while SAM2 is still busy must not be dropped
+    assert viewmodel.queue_point_command.can_execute()
+    viewmodel.queue_point_command.execute(60, 40, 1)
+    viewmodel.queue_point_command.execute(90, 70, 0)
+    viewmodel.flush_points_command.execute()
+    
+    service.gate.set()
+    viewmodel._wait_for_background()
+    viewmodel._wait_for_background()
+    
+    assert [(p.x, p.y, p.label) for p in viewmodel.current_frame_points] == [
+        (20, 20, 1), (60, 40, 1), (90, 70, 0)]
+    # Both held clicks went to SAM2 together
+    assert service.calls == [1, 3]
+    assert not viewmodel.is_processing
+
+
+def test_cached_overlays_survive_pool_reuse(viewmodel):
+    viewmodel.add_point_command.execute(40, 40, 1)
+    viewmodel._wait_for_background()
+    
+    held_masks = viewmodel.get_current_frame_with_masks().copy()
+    held_overlay = viewmodel.get_current_frame_with_overlay().copy()
+    
+    # Compose three other frames; the round-robin pool hands out every buffer again
+    masks = viewmodel.current_frame_masks
+    for frame_index in (3, 6, 9):
+        viewmodel._draw_mask_overlay(viewmodel.video_service.get_frame(frame_index), masks)
+    
+    # The cache keys haven't changed, so they must still give the same images
+    assert np.array_equal(viewmodel.get_current_frame_with_masks(), held_masks)
+    assert np.array_equal(viewmodel.get_current_frame_with_overlay(), held_overlay)
+
+
+def test_masks_cache_does_not_pick_up_points(viewmodel):
+    viewmodel.add_point_command.execute(40, 40, 1)
+    viewmodel._wait_for_background()
+    
+    masks_only = viewmodel.get_current_frame_with_masks().copy()
+    # Alternate the two compositions so the pool wraps around under the masks cache
+    for _ in range(2 * OVERLAY_BUFFERS):
+        viewmodel._invalidate_overlay(masks=False)
+        viewmodel.get_current_frame_with_overlay()
+        assert np.array_equal(viewmodel.get_current_frame_with_masks(), masks_only)
+
+
+def test_overlay_draws_points_over_masks(viewmodel):
+    viewmodel.add_point_command.execute(40, 40, 1)
+    viewmodel._wait_for_background()
+    viewmodel.add_point_command.execute(100, 80, 0)
+    viewmodel._wait_for_background()
+    
+    base = viewmodel.get_current_frame()
+    masks_only = viewmodel.get_current_frame_with_masks()
+    overlay = viewmodel.get_current_frame_with_overlay()
+    
+    # The mask tints the frame; the markers go on top with the label's color
+    # (the marker centre is its white core, so check a stroke pixel above it)
+    assert not np.array_equal(masks_only[70:90, 90:110], base[70:90, 90:110])
+    assert tuple(overlay[35, 40]) == POINT_COLORS[1]
+    assert tuple(overlay[75, 100]) == POINT_COLORS[0]
+    assert tuple(masks_only[75, 100]) != POINT_COLORS[0]
+    
+    # Same key, same image; adding a point changes the key
+    key = viewmodel.overlay_key
+    assert viewmodel.get_current_frame_with_overlay() is overlay
+    viewmodel.add_point_command.execute(20, 20, 1)
+    viewmodel._wait_for_background()
+    assert viewmodel.overlay_key != key
+    assert tuple(viewmodel.get_current_frame_with_overlay()[15, 20]) == POINT_COLORS[1]
+
+
+def test_points_with_other_labels_draw_as_negative(viewmodel):
+    frame = viewmodel.get_current_frame().copy()
+    points = [Point(40, 40, -1, 0), Point(100, 80, 2, 0)]
+    
+    viewmodel._draw_points_overlay(frame, points)
+    
+    assert tuple(frame[35, 40]) == POINT_COLORS[0]
+    assert tuple(frame[75, 100]) == POINT_COLORS[0]